@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+
+def write_atomic(path, data):
+    """Replace path with data (str or bytes) in one step, readable by the current user only
+
+    The data goes to a temporary file in the same directory, which then
+    replaces path, so readers see either the old file or the new one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, (bytes, bytearray, memoryview)) else 'w') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,111 @@
+import math
+import cmath
+import time
+import argparse
+
+from complex_expr import compile_expression, evaluate
+
+# Written with j so the original eval path can run them too
+EXPRESSIONS = [
+    '(3+4j)*(1-2j)',
+    'sqrt(-4)+exp(1j*π)',
+    '2×(1+1j)**2÷(3-1j)',
+    'sin(1+1j)*cos(1-1j)+tanh(0.5j)',
+    'abs(rect(2, π÷4))+phase(-1j)+log10(100)',
+]
+
+
+def eval_calculate(expression):
+    """The original eval-based NAFFYComplexCalculator.calculate path"""
+    expr = expression.replace('×', '*').replace('÷', '/')
+    expr = expr.replace('π', str(math.pi))
+    safe_dict = {
+        'abs': abs,
+        'sqrt': cmath.sqrt,
+        'exp': cmath.exp,
+        'log': cmath.log,
+        'log10': cmath.log10,
+        'sin': cmath.sin,
+        'cos': cmath.cos,
+        'tan': cmath.tan,
+        'sinh': cmath.sinh,
+        'cosh': cmath.cosh,
+        'tanh': cmath.tanh,
+        'phase': cmath.phase,
+        'polar': cmath.polar,
+        'rect': cmath.rect
+    }
+    return eval(expr, {"__builtins__": {}}, safe_dict)
+
+
+def cold_evaluate(expression):
+    compile_expression.cache_clear()
+    return evaluate(expression)
+
+
+def best_of(function, argument, number, repeat):
+    """Best per-call time in seconds over repeat runs of number calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function(argument)
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calculator expression evaluation benchmark")
+    parser.add_argument('--number', type=int, default=2000, help="calls per timing run")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--grid', type=int, default=500, help="grid side for the NumPy comparison")
+    args = parser.parse_args()
+
+    print(f"{'expression':44} {'eval':>9} {'cold':>9} {'cached':>9} {'speedup':>8}")
+    for expression in EXPRESSIONS:
+        expected = eval_calculate(expression)
+        result = evaluate(expression)
+        if not cmath.isclose(complex(result), complex(expected), rel_tol=1e-12, abs_tol=1e-12):
+            print(f"[-] {expression}: {result} != {expected}")
+            continue
+        eval_time = best_of(eval_calculate, expression, args.number, args.repeat)
+        cold_time = best_of(cold_evaluate, expression, args.number, args.repeat)
+        warm_time = best_of(evaluate, expression, args.number, args.repeat)
+        print(f"{expression:44} {eval_time * 1e6:7.1f}us {cold_time * 1e6:7.1f}us "
+              f"{warm_time * 1e6:7.1f}us {eval_time / warm_time:7.1f}x")
+
+    # Re-evaluating one expression with new bindings skips parsing entirely
+    z_squared = compile_expression('z^2+c')
+    points = [complex(x / 100, y / 100) for x in range(-100, 100, 4) for y in range(-100, 100, 4)]
+    start = time.perf_counter()
+    for z in points:
+        eval('z**2+c', {"__builtins__": {}}, {'z': z, 'c': 0.25j})
+    eval_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for z in points:
+        z_squared(z=z, c=0.25j)
+    compiled_time = time.perf_counter() - start
+    print(f"\n'z^2+c' over {len(points)} points: eval {eval_time * 1000:.2f} ms, "
+          f"compiled {compiled_time * 1000:.2f} ms ({eval_time / compiled_time:.1f}x)")
+
+    # The same expression over a whole grid: a cmath loop against one vectorized pass
+    grid_expression = 'exp(z)/(z^2+0.2z+1)'
+    side = args.grid
+    try:
+        from complex_grid import evaluate_grid, vectorize
+        vectorize(grid_expression)
+    except ImportError:
+        print("\n  NumPy is not installed; skipping the grid comparison")
+    else:
+        scalar = compile_expression(grid_expression)
+        xs = [-2 + 4 * k / (side - 1) for k in range(side)]
+        start = time.perf_counter()
+        for y in xs:
+            for x in xs:
+                scalar(z=complex(x, y))
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        evaluate_grid(grid_expression, shape=(side, side))
+        numpy_time = time.perf_counter() - start
+        print(f"'{grid_expression}' over a {side}x{side} grid: cmath loop {loop_time * 1000:.1f} ms, "
+              f"NumPy {numpy_time * 1000:.1f} ms ({loop_time / numpy_time:.1f}x)")
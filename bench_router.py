@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import time
+import tempfile
+import argparse
+import importlib.util
+import importlib.machinery
+from concurrent.futures import ThreadPoolExecutor
+
+from latency import percentile
+from router_cache import RouterCache
+from router_emulator import RouterEmulator
+
+SCENARIOS = ('login', 'devices', 'poll', 'fleet')
+
+
+def load_admin():
+    """Import ADMIN.PY, whose upper-case suffix the normal import system skips"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ADMIN.PY')
+    loader = importlib.machinery.SourceFileLoader('router_admin', path)
+    spec = importlib.util.spec_from_loader('router_admin', loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def summarize(name, timings, failures, wall_time, **extra):
+    """Latency percentiles in milliseconds and operations per second"""
+    ordered = sorted(t * 1000 for t in timings)
+    result = {
+        'scenario': name,
+        'operations': len(timings) + failures,
+        'failures': failures,
+        'throughput': len(timings) / wall_time if wall_time else 0.0,
+        'min': ordered[0] if ordered else None,
+        'p50': percentile(ordered, 0.50),
+        'p90': percentile(ordered, 0.90),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else None,
+    }
+    result.update(extra)
+    return result
+
+
+def run_concurrent(operation, iterations, concurrency):
+    """Call operation(i) iterations times from concurrency threads; returns timings, failures, wall time"""
+    def timed(i):
+        start = time.perf_counter()
+        ok = operation(i)
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(iterations)))
+    wall_time = time.perf_counter() - start
+    timings = [elapsed for elapsed, ok in results if ok]
+    return timings, len(results) - len(timings), wall_time
+
+
+class RouterBenchmark:
+    """Drive RouterController scenarios against local router emulators"""
+
+    def __init__(self, admin, emulator_options, iterations=200, concurrency=8, routers=50,
+                 emulators=4):
+        self.admin = admin
+        self.emulator_options = emulator_options
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.routers = routers          # Fleet scenario inventory size
+        self.emulators = emulators      # Emulators the fleet inventory is spread over
+        self.cache_dir = tempfile.mkdtemp(prefix='router_bench_')
+
+    def _controller(self, address, cache=None):
+        return self.admin.RouterController(address, 'admin', self.emulator_options.get('password', 'admin'),
+                                           cache=cache, verbose=False)
+
+    def _cache(self, name):
+        return RouterCache(os.path.join(self.cache_dir, f"{name}.json"))
+
+    def login(self, address):
+        """Fresh controller, full endpoint discovery and form login every time"""
+        def operation(i):
+            controller = self._controller(address)
+            try:
+                return controller.login_to_router()
+            finally:
+                controller.session.close()
+        return summarize('login', *run_concurrent(operation, self.iterations, self.concurrency))
+
+    def devices(self, address):
+        """Logged-in controllers listing devices from their cached endpoint"""
+        cache = self._cache('devices')
+        controllers = [self._controller(address, cache) for _ in range(self.concurrency)]
+        for controller in controllers:
+            controller.login_to_router()
+            controller.get_connected_devices()  # Discover and cache the endpoint
+
+        def operation(i):
+            return bool(controllers[i % len(controllers)].get_connected_devices())
+        return summarize('devices', *run_concurrent(operation, self.iterations, self.concurrency))
+
+    def poll(self, address):
+        """Conditional polling of an unchanged device page"""
+        controllers = [self._controller(address) for _ in range(self.concurrency)]
+        states = [{} for _ in controllers]
+        for controller, state in zip(controllers, states):
+            controller.login_to_router()
+            controller.poll_devices(state)
+            controller.poll_devices(state)  # Second poll picks up the validators
+
+        def operation(i):
+            slot = i % len(controllers)
+            controllers[slot].poll_devices(states[slot])
+            return states[slot]['status'] != 'failed'
+        return summarize('poll', *run_concurrent(operation, self.iterations, self.concurrency))
+
+    def fleet(self, addresses):
+        """Login and device listing for a whole inventory through RouterFleet
+
+        Entries on the same emulator take turns, as RouterFleet limits
+        requests per address; use --emulators to run more of them at once.
+        """
+        inventory = [{'ip': addresses[i % len(addresses)], 'username': 'admin',
+                      'password': self.emulator_options.get('password', 'admin'), 'name': f"router-{i}"}
+                     for i in range(self.routers)]
+        fleet = self.admin.RouterFleet(inventory, max_routers=self.concurrency * 4, per_host=2)
+        start = time.perf_counter()
+        results = list(fleet.run())
+        wall_time = time.perf_counter() - start
+        timings = [result['elapsed'] for result in results if result['ok']]
+        return summarize('fleet', timings, len(results) - len(timings), wall_time,
+                         routers=len(results))
+
+    def run(self, scenarios):
+        servers = [RouterEmulator(**self.emulator_options) for _ in range(max(1, self.emulators))]
+        addresses = [server.start() for server in servers]
+        try:
+            for name in scenarios:
+                if name == 'fleet':
+                    result = self.fleet(addresses)
+                else:
+                    result = getattr(self, name)(addresses[0])
+                result['requests'] = sum(server.counters['requests'] for server in servers)
+                for server in servers:
+                    for counter in server.counters:
+                        server.counters[counter] = 0
+                yield result
+        finally:
+            for server in servers:
+                server.stop()
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def print_result(result):
+    if result['p50'] is None:
+        print(f"{result['scenario']:<9}{'all operations failed':>40}")
+        return
+    print(f"{result['scenario']:<9}{result['operations']:>7}{result['failures']:>7}"
+          f"{result['throughput']:>10.1f}{result['p50']:>9.2f}{result['p90']:>9.2f}"
+          f"{result['p99']:>9.2f}{result['max']:>9.2f}{result['requests']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RouterController benchmarks against local emulators")
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('--routers', type=int, default=50, help="fleet inventory size")
+    parser.add_argument('--emulators', type=int, default=4, help="emulators behind the fleet, each one served an entry at a time")
+    parser.add_argument('--devices', type=int, default=50, help="rows in each device table")
+    parser.add_argument('--latency', type=float, default=0.005, help="emulated seconds per response")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--json', metavar='PATH', help="also write results as JSON Lines")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+
+    options = {'devices': args.devices, 'latency': args.latency, 'jitter': args.jitter,
+               'error_rate': args.error_rate}
+    benchmark = RouterBenchmark(load_admin(), options, iterations=args.iterations,
+                                concurrency=args.concurrency, routers=args.routers,
+                                emulators=args.emulators)
+
+    print(f"Emulated router: {args.devices} devices, {args.latency * 1000:.1f} ms latency, "
+          f"{args.error_rate:.1%} errors; {args.concurrency} concurrent clients")
+    print(f"\n{'Scenario':<9}{'Ops':>7}{'Fail':>7}{'Ops/s':>10}{'P50':>9}{'P90':>9}"
+          f"{'P99':>9}{'Max':>9}{'Requests':>10}")
+    print("-" * 79)
+    output = open(args.json, 'w') if args.json else None
+    try:
+        for result in benchmark.run(args.scenarios or SCENARIOS):
+            print_result(result)
+            if output:
+                output.write(json.dumps(result) + '\n')
+    finally:
+        if output:
+            output.close()
+    print("\nTimes in ms; fleet times are per router, Requests counts HTTP requests served")
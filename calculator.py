@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import cmath
 import math
+import calculator_core
+from calculator_worker import EvaluationWorker
+
+PREVIEW_DELAY_MS = 150  # Typing pause before the live preview is evaluated
+POLL_MS = 16            # Worker results are picked up once a frame while a job runs
 
 class NAFFYComplexCalculator:
     def __init__(self, root):
@@ -14,6 +18,12 @@ class NAFFYComplexCalculator:
         self.result_display = ""
         self.memory = 0+0j
         
+        # Math runs in a separate process so heavy input can't freeze the window
+        self.worker = EvaluationWorker()
+        self._preview_job = None
+        self._polling = False
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        
         # Styling
         self.style = ttk.Style()
         self.style.theme_use('clam')
@@ -116,52 +126,11 @@ class NAFFYComplexCalculator:
     
     def parse_complex(self, text):
         """Parse complex number from text input"""
-        try:
-            # Remove any spaces
-            text = text.replace(' ', '')
-            
-            # Handle j notation (engineering)
-            if 'j' in text:
-                text = text.replace('j', 'i')
-            
-            # Handle simple numbers
-            if text.replace('.', '').replace('-', '').isdigit():
-                return float(text) + 0j
-            
-            # Handle complex numbers in a+bi format
-            if '+' in text or '-' in text[1:]:
-                # Find the imaginary part
-                if 'i' in text:
-                    parts = text.replace('i', '').split('+')
-                    if len(parts) == 2:
-                        return complex(float(parts[0]), float(parts[1]))
-                    else:
-                        # Handle a-bi format
-                        if '-' in text[1:]:
-                            idx = text[1:].find('-') + 1
-                            real = float(text[:idx])
-                            imag = float(text[idx:-1].replace('i', ''))
-                            return complex(real, imag)
-                return complex(text)
-            return complex(text)
-        except:
-            return None
+        return calculator_core.parse_complex(text)
     
     def format_complex(self, num):
         """Format complex number for display"""
-        if isinstance(num, (int, float)):
-            return f"{num:.10g}"
-        
-        real = num.real
-        imag = num.imag
-        
-        if imag == 0:
-            return f"{real:.10g}"
-        elif real == 0:
-            return f"{imag:.10g}i"
-        else:
-            sign = '+' if imag >= 0 else '-'
-            return f"{real:.10g} {sign} {abs(imag):.10g}i"
+        return calculator_core.format_complex(num)
     
     def button_click(self, button_text):
         """Handle button clicks"""
@@ -175,7 +144,8 @@ class NAFFYComplexCalculator:
             'π': self.add_pi,
             '.': self.add_decimal,
             'ENG': self.toggle_engineering,
-            'Sci': self.toggle_scientific
+            'Sci': self.toggle_scientific,
+            'xʸ': lambda: self.add_operator('^')  # A binary operator, not a function of the result
         }
         
         # Memory operations
@@ -189,7 +159,7 @@ class NAFFYComplexCalculator:
             return
         
         # Mathematical functions
-        if button_text in ['x²', '√', '|z|', '∠', 'xʸ', 'eˣ', 'ln', 'log',
+        if button_text in ['x²', '√', '|z|', '∠', 'eˣ', 'ln', 'log',
                           'sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh',
                           '1/z', 'conj', 'Re', 'Im']:
             self.apply_function(button_text)
@@ -272,96 +242,59 @@ class NAFFYComplexCalculator:
     
     def apply_function(self, func):
         """Apply mathematical function to current result"""
-        try:
-            current_value = self.parse_complex(self.result_display)
-            if current_value is None:
-                return
-            
-            result = None
-            
-            if func == 'x²':
-                result = current_value ** 2
-            elif func == '√':
-                result = cmath.sqrt(current_value)
-            elif func == '|z|':
-                result = abs(current_value)
-            elif func == '∠':
-                result = cmath.phase(current_value)
-            elif func == 'eˣ':
-                result = cmath.exp(current_value)
-            elif func == 'ln':
-                result = cmath.log(current_value)
-            elif func == 'log':
-                result = cmath.log10(current_value)
-            elif func == 'sin':
-                result = cmath.sin(current_value)
-            elif func == 'cos':
-                result = cmath.cos(current_value)
-            elif func == 'tan':
-                result = cmath.tan(current_value)
-            elif func == 'sinh':
-                result = cmath.sinh(current_value)
-            elif func == 'cosh':
-                result = cmath.cosh(current_value)
-            elif func == 'tanh':
-                result = cmath.tanh(current_value)
-            elif func == '1/z':
-                result = 1 / current_value
-            elif func == 'conj':
-                result = current_value.conjugate()
-            elif func == 'Re':
-                result = current_value.real
-            elif func == 'Im':
-                result = current_value.imag
-            
-            if result is not None:
-                self.result_display = self.format_complex(result)
-                self.current_expression = self.result_display
-                self.update_display()
-        except Exception as e:
-            self.show_error(f"Error applying {func}: {str(e)}")
+        if self.parse_complex(self.result_display) is None:
+            return
+        self.run_job('apply', (func, self.result_display),
+                     lambda ok, text: self.show_result(ok, text, f"Error applying {func}"))
     
     def calculate(self):
         """Calculate the expression"""
-        try:
-            # Prepare expression for eval
-            expr = self.current_expression
-            
-            # Replace display operators with Python operators
-            expr = expr.replace('×', '*').replace('÷', '/')
-            
-            # Handle special constants
-            expr = expr.replace('π', str(math.pi))
-            
-            # Use cmath functions for complex operations
-            # Note: In production, use a safer evaluation method
-            safe_dict = {
-                'abs': abs,
-                'sqrt': cmath.sqrt,
-                'exp': cmath.exp,
-                'log': cmath.log,
-                'log10': cmath.log10,
-                'sin': cmath.sin,
-                'cos': cmath.cos,
-                'tan': cmath.tan,
-                'sinh': cmath.sinh,
-                'cosh': cmath.cosh,
-                'tanh': cmath.tanh,
-                'phase': cmath.phase,
-                'polar': cmath.polar,
-                'rect': cmath.rect
-            }
-            
-            # Evaluate the expression
-            result = eval(expr, {"__builtins__": {}}, safe_dict)
-            
-            # Format and display result
-            self.result_display = self.format_complex(result)
+        self.cancel_preview()
+        self.run_job('calculate', (self.current_expression,),
+                     lambda ok, text: self.show_result(ok, text, "Calculation error"))
+    
+    def show_result(self, ok, text, context):
+        """Display a finished calculation"""
+        if ok:
+            self.result_display = text
             self.current_expression = self.result_display
             self.update_display()
-            
-        except Exception as e:
-            self.show_error(f"Calculation error: {str(e)}")
+        else:
+            self.show_error(f"{context}: {text}")
+    
+    def run_job(self, task, args, callback):
+        """Hand a job to the worker, replacing any unfinished one, and watch for its result"""
+        self.worker.submit(task, args, callback)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self.poll_worker)
+    
+    def poll_worker(self):
+        """Run callbacks of finished jobs on the Tk thread"""
+        self.worker.dispatch()
+        if self.worker.busy:
+            self.root.after(POLL_MS, self.poll_worker)
+        else:
+            self._polling = False
+    
+    def preview(self):
+        """Evaluate the expression being typed and show it as a provisional result"""
+        self._preview_job = None
+        expression = self.current_expression
+        if not expression or expression == self.result_display:
+            return
+        
+        def show_preview(ok, text):
+            # Incomplete input fails all the time while typing; only show values
+            if ok and self.current_expression == expression:
+                self.result_var.set(f"= {text}")
+        
+        self.run_job('calculate', (expression,), show_preview)
+    
+    def cancel_preview(self):
+        if self._preview_job is not None:
+            self.root.after_cancel(self._preview_job)
+            self._preview_job = None
     
     def toggle_engineering(self):
         """Toggle engineering notation (not fully implemented)"""
@@ -375,15 +308,25 @@ class NAFFYComplexCalculator:
         """Update the display"""
         self.expression_var.set(self.current_expression)
         self.result_var.set(self.result_display)
+        
+        # Debounced: each edit restarts the wait, so a burst of typing costs one evaluation
+        self.cancel_preview()
+        self._preview_job = self.root.after(PREVIEW_DELAY_MS, self.preview)
     
     def show_error(self, message):
-        """Show error message"""
-        messagebox.showerror("Error", message)
+        """Show error message in the result display rather than a modal dialog"""
         self.clear()
+        self.result_var.set(message)
+    
+    def close(self):
+        """Stop the worker process and close the window"""
+        self.cancel_preview()
+        self.worker.close()
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
-    app = ComplexCalculator(root)
+    app = NAFFYComplexCalculator(root)
     root.mainloop()
 
 if __name__ == "__main__":
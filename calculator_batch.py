@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from calculator_core import calculate
+
+# Lines per task; large enough that pickling is cheap next to the math
+CHUNK_LINES = 4096
+TASKS_PER_WORKER = 4  # Chunks queued ahead per worker; bounds memory on endless input
+
+
+def evaluate_lines(text, echo=False):
+    """Evaluate one expression per line; each becomes a result or 'error: ...' line"""
+    output = []
+    # Only '\n' ends a line (strip() drops a '\r' before it): splitlines() would
+    # also split on \x0c, \x1c-\x1e, \x85 and \u2028, giving more results than lines
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    for line in lines:
+        expression = line.strip()
+        if not expression:
+            result = ''
+        else:
+            try:
+                result = calculate(expression)
+            except Exception as e:
+                result = f"error: {e}"
+        output.append(f"{expression}\t{result}" if echo else result)
+    return '\n'.join(output) + '\n'
+
+
+def iter_chunks(lines, size=CHUNK_LINES):
+    """(text, line count) blocks of up to size lines; one string pickles far faster than a list"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield ''.join(chunk), size
+            chunk = []
+    if chunk:
+        yield ''.join(chunk), len(chunk)
+
+
+def run_batch(lines, write, workers=None, chunk_lines=CHUNK_LINES, echo=False):
+    """Evaluate lines on a process pool, writing results in input order; returns the line count"""
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    if workers == 1:
+        for chunk, lines_in_chunk in iter_chunks(lines, chunk_lines):
+            write(evaluate_lines(chunk, echo))
+            count += lines_in_chunk
+        return count
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()  # Futures in input order
+        for chunk, lines_in_chunk in iter_chunks(lines, chunk_lines):
+            pending.append(pool.submit(evaluate_lines, chunk, echo))
+            count += lines_in_chunk
+            if len(pending) >= workers * TASKS_PER_WORKER:
+                # Oldest first keeps the output ordered; the rest keep the workers busy
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate calculator expressions in bulk, one per line")
+    parser.add_argument('input', nargs='?', default='-', help="expressions file ('-' for stdin)")
+    parser.add_argument('-o', '--output', help="results file (default stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (1 evaluates in this process)")
+    parser.add_argument('--chunk-lines', type=int, default=CHUNK_LINES, help="lines per task")
+    parser.add_argument('--echo', action='store_true', help="write 'expression<TAB>result' lines")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    target = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        count = run_batch(source, target.write, args.workers, args.chunk_lines, args.echo)
+    except KeyboardInterrupt:
+        print("\n[-] Interrupted", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    elapsed = time.perf_counter() - start
+    print(f"[+] {count} lines in {elapsed:.2f} s ({count / elapsed:,.0f} lines/s, "
+          f"{args.workers} workers)", file=sys.stderr)
@@ -0,0 +1,63 @@
+import cmath
+
+from complex_expr import compile_expression, evaluate
+
+# Calculator buttons that act on the current result
+UNARY_FUNCTIONS = {
+    'x²': lambda z: z ** 2,
+    '√': cmath.sqrt,
+    '|z|': abs,
+    '∠': cmath.phase,
+    'eˣ': cmath.exp,
+    'ln': cmath.log,
+    'log': cmath.log10,
+    'sin': cmath.sin,
+    'cos': cmath.cos,
+    'tan': cmath.tan,
+    'sinh': cmath.sinh,
+    'cosh': cmath.cosh,
+    'tanh': cmath.tanh,
+    '1/z': lambda z: 1 / z,
+    'conj': lambda z: z.conjugate(),
+    'Re': lambda z: z.real,
+    'Im': lambda z: z.imag,
+}
+
+
+def format_complex(num):
+    """Format complex number for display"""
+    if isinstance(num, (int, float)):
+        return f"{num:.10g}"
+
+    real = num.real
+    imag = num.imag
+
+    if imag == 0:
+        return f"{real:.10g}"
+    elif real == 0:
+        return f"{imag:.10g}i"
+    else:
+        sign = '+' if imag >= 0 else '-'
+        return f"{real:.10g} {sign} {abs(imag):.10g}i"
+
+
+def parse_complex(text):
+    """Complex value of a displayed number such as '3', '-2.5i' or '1 - 2i', or None"""
+    try:
+        expression = compile_expression(text.replace('j', 'i'))
+        if not expression.constant:
+            return None
+        return complex(expression())
+    except (ValueError, TypeError, ArithmeticError):
+        return None
+
+
+def apply_function(func, value):
+    """Result of a function button applied to value, or None for unknown buttons"""
+    function = UNARY_FUNCTIONS.get(func)
+    return function(value) if function is not None else None
+
+
+def calculate(expression):
+    """Evaluate an expression and format the result the way the display shows it"""
+    return format_complex(evaluate(expression))
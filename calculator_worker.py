@@ -0,0 +1,190 @@
+import time
+import threading
+import multiprocessing
+from collections import deque
+
+from calculator_core import apply_function, calculate, format_complex, parse_complex
+
+# Seconds a job may run before its process is killed and the job reported as failed
+TIME_BUDGET = 2.0
+# Seconds a superseded job may keep running; most finish in microseconds
+CANCEL_GRACE = 0.05
+POLL_INTERVAL = 0.01
+
+
+def apply_to_text(func, text):
+    """A function button applied to a displayed value, formatted for display"""
+    value = parse_complex(text)
+    if value is None:
+        raise ValueError(f"{text!r} is not a number")
+    result = apply_function(func, value)
+    if result is None:
+        raise ValueError(f"unknown function {func!r}")
+    return format_complex(result)
+
+
+# Jobs the child process accepts, by name, so nothing callable crosses the pipe
+TASKS = {
+    'calculate': calculate,
+    'apply': apply_to_text,
+}
+
+
+def serve(connection):
+    """Child process loop: (task, args) in, (ok, result text or error message) out"""
+    while True:
+        try:
+            task, args = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        try:
+            reply = (True, TASKS[task](*args))
+        except Exception as e:
+            reply = (False, str(e) or type(e).__name__)
+        connection.send(reply)
+
+
+class EvaluationWorker:
+    """Runs calculator jobs in a child process so the GUI thread never waits on the math
+
+    Only the newest job matters: submitting one cancels the job before it.
+    A job that outlives the time budget, or is cancelled and keeps running,
+    has its process killed and replaced. Callbacks never run on the worker's
+    thread; the GUI calls dispatch() (e.g. from root.after) to run them.
+    """
+
+    def __init__(self, time_budget=TIME_BUDGET):
+        self.time_budget = time_budget
+        self.stats = {'jobs': 0, 'cancelled': 0, 'timeouts': 0, 'restarts': 0}
+        # Spawn, not fork: forking a process holding a Tk connection and threads is
+        # unsafe. A spawned child still re-imports the main script (calculator.py,
+        # and tkinter with it), but builds no window since that is __main__-only.
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._connection = None
+        self._condition = threading.Condition()
+        self._job = None          # (generation, task, args, callback) waiting to start
+        self._generation = 0      # Bumped by every submit and cancel
+        self._finished = deque()  # (callback, ok, text) waiting for dispatch()
+        self._closed = False
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name='calculator-worker', daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        """True while a job is queued, running or waiting for dispatch()"""
+        with self._condition:
+            return self._job is not None or self._running or bool(self._finished)
+
+    def submit(self, task, args, callback):
+        """Queue task(*args), replacing any pending job; callback(ok, text) runs in dispatch()"""
+        with self._condition:
+            self._generation += 1
+            if self._job is not None or self._running:
+                self.stats['cancelled'] += 1
+            self._job = (self._generation, task, args, callback)
+            self._condition.notify()
+
+    def cancel(self):
+        """Drop the pending job and abandon the running one"""
+        with self._condition:
+            self._generation += 1
+            if self._job is not None or self._running:
+                self.stats['cancelled'] += 1
+            self._job = None
+            self._finished.clear()
+
+    def dispatch(self):
+        """Run callbacks of finished jobs on the calling thread"""
+        while True:
+            with self._condition:
+                if not self._finished:
+                    return
+                callback, ok, text = self._finished.popleft()
+            callback(ok, text)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._generation += 1  # Abandon the running job
+            self._job = None
+            self._condition.notify()
+        self._thread.join(1.0)
+        self._stop_process()
+
+    def _start_process(self):
+        parent, child = self._context.Pipe()
+        self._process = self._context.Process(target=serve, args=(child,),
+                                              name='calculator-eval', daemon=True)
+        self._process.start()
+        child.close()
+        self._connection = parent
+
+    def _stop_process(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._connection.close()
+            self._process = None
+            self._connection = None
+
+    def _run(self):
+        self._start_process()  # Ready before the first job arrives
+        while True:
+            with self._condition:
+                while self._job is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                generation, task, args, callback = self._job
+                self._job = None
+                self._running = True
+            try:
+                ok, text = self._execute(generation, task, args)
+            finally:
+                with self._condition:
+                    self._running = False
+            if ok is None:
+                continue  # Cancelled; nobody wants the result
+            with self._condition:
+                if generation == self._generation:
+                    self.stats['jobs'] += 1
+                    self._finished.append((callback, ok, text))
+
+    def _execute(self, generation, task, args):
+        """(ok, text), or (None, None) if the job was superseded"""
+        if self._process is None or not self._process.is_alive():
+            self._stop_process()
+            self._start_process()
+        try:
+            self._connection.send((task, args))
+        except (OSError, ValueError) as e:
+            self._restart()
+            return False, f"evaluation process failed: {e}"
+
+        start = time.monotonic()
+        cancelled_at = None
+        while True:
+            try:
+                if self._connection.poll(POLL_INTERVAL):
+                    return self._connection.recv()
+            except (EOFError, OSError):
+                self._restart()
+                return False, "evaluation process exited"
+            now = time.monotonic()
+            if generation != self._generation:
+                if cancelled_at is None:
+                    cancelled_at = now
+                elif now - cancelled_at > CANCEL_GRACE:
+                    self._restart()
+                    return None, None
+            if now - start > self.time_budget:
+                self.stats['timeouts'] += 1
+                self._restart()
+                return False, f"took longer than {self.time_budget:g} s"
+
+    def _restart(self):
+        self.stats['restarts'] += 1
+        self._stop_process()
+        self._start_process()
@@ -0,0 +1,278 @@
+import re
+import cmath
+import math
+from functools import lru_cache
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(?P<imag>[ij](?![A-Za-z_0-9]))?
+      | (?P<name>[A-Za-z_π][A-Za-z_0-9]*)
+      | (?P<op>\*\*|[-+*/^×÷(),])
+    )""", re.VERBOSE)
+
+FUNCTIONS = {
+    'abs': abs,
+    'sqrt': cmath.sqrt,
+    'exp': cmath.exp,
+    'log': cmath.log,
+    'log10': cmath.log10,
+    'sin': cmath.sin,
+    'cos': cmath.cos,
+    'tan': cmath.tan,
+    'sinh': cmath.sinh,
+    'cosh': cmath.cosh,
+    'tanh': cmath.tanh,
+    'phase': cmath.phase,
+    'polar': cmath.polar,
+    'rect': cmath.rect,
+    'conj': lambda z: complex(z).conjugate(),
+    're': lambda z: complex(z).real,
+    'im': lambda z: complex(z).imag,
+}
+
+CONSTANTS = {
+    'i': 1j,
+    'j': 1j,
+    'pi': math.pi,
+    'π': math.pi,
+    'e': math.e,
+}
+
+BINARY = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '^': lambda a, b: a ** b,
+}
+
+# Compiled forms kept per expression text
+CACHE_SIZE = 512
+
+
+class ExpressionError(ValueError):
+    """The expression text could not be parsed"""
+
+    def __init__(self, message, position):
+        super().__init__(f"{message} at position {position}")
+        self.position = position
+
+
+def tokenize(text):
+    """(kind, value, position) tuples; kind is 'number', 'name', 'op' or 'end'"""
+    tokens = []
+    position = 0
+    length = len(text)
+    while position < length:
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            if text[position:].strip() == '':
+                break
+            raise ExpressionError(f"unexpected {text[position]!r}", position)
+        start = match.start(match.lastgroup) if match.lastgroup != 'imag' else match.start('number')
+        if match.group('number') is not None:
+            value = float(match.group('number'))
+            tokens.append(('number', complex(0, value) if match.group('imag') else value, start))
+        elif match.group('name') is not None:
+            tokens.append(('name', match.group('name'), start))
+        else:
+            op = match.group('op')
+            tokens.append(('op', {'**': '^', '×': '*', '÷': '/'}.get(op, op), start))
+        position = match.end()
+    tokens.append(('end', None, length))
+    return tokens
+
+
+def _constant(value):
+    node = lambda env: value
+    node.constant = value
+    return node
+
+
+def _is_constant(node):
+    return hasattr(node, 'constant')
+
+
+class Parser:
+    """Recursive descent parser that compiles straight to closures
+
+    expression := term (('+' | '-') term)*
+    term       := unary (('*' | '/') unary | implicit multiplication)*
+    unary      := ('+' | '-') unary | power
+    power      := atom ('^' unary)?
+    atom       := number | name | name '(' arguments ')' | '(' expression ')'
+
+    If folding constants raises an ArithmeticError and number is given, the
+    fold is retried on number(value) operands instead (e.g. NumPy scalars,
+    for which 1/0 is inf); without it the error is raised at compile time.
+    """
+
+    def __init__(self, text, functions=FUNCTIONS, number=None):
+        self.text = text
+        self.functions = functions
+        self.number = number
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.variables = set()
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def take(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, op):
+        kind, value, position = self.take()
+        if kind != 'op' or value != op:
+            found = 'end of expression' if kind == 'end' else repr(value)
+            raise ExpressionError(f"expected {op!r}, found {found}", position)
+
+    def parse(self):
+        node = self.expression()
+        kind, value, position = self.peek()
+        if kind != 'end':
+            raise ExpressionError(f"unexpected {value!r}", position)
+        return node
+
+    def _fold(self, function, *values):
+        try:
+            return _constant(function(*values))
+        except ArithmeticError:
+            if self.number is None:
+                raise
+            return _constant(function(*map(self.number, values)))
+
+    def _binary(self, op, left, right):
+        function = BINARY[op]
+        if _is_constant(left) and _is_constant(right):
+            return self._fold(function, left.constant, right.constant)
+        # Specialised closures avoid a second call per operation
+        if op == '+':
+            return lambda env: left(env) + right(env)
+        if op == '-':
+            return lambda env: left(env) - right(env)
+        if op == '*':
+            return lambda env: left(env) * right(env)
+        if op == '/':
+            return lambda env: left(env) / right(env)
+        return lambda env: left(env) ** right(env)
+
+    def expression(self):
+        node = self.term()
+        while True:
+            kind, value, _ = self.peek()
+            if kind == 'op' and value in '+-':
+                self.take()
+                node = self._binary(value, node, self.term())
+            else:
+                return node
+
+    def term(self):
+        node = self.unary()
+        while True:
+            kind, value, _ = self.peek()
+            if kind == 'op' and value in '*/':
+                self.take()
+                node = self._binary(value, node, self.unary())
+            elif kind == 'name' or (kind == 'op' and value == '('):
+                # Implicit multiplication: 2π, 3(1+i), 2sin(x); "2 3" stays an error
+                node = self._binary('*', node, self.unary())
+            else:
+                return node
+
+    def unary(self):
+        kind, value, _ = self.peek()
+        if kind == 'op' and value in '+-':
+            self.take()
+            operand = self.unary()
+            if value == '+':
+                return operand
+            if _is_constant(operand):
+                return _constant(-operand.constant)
+            return lambda env: -operand(env)
+        return self.power()
+
+    def power(self):
+        node = self.atom()
+        kind, value, _ = self.peek()
+        if kind == 'op' and value == '^':
+            self.take()
+            node = self._binary('^', node, self.unary())  # Right associative
+        return node
+
+    def atom(self):
+        kind, value, position = self.take()
+        if kind == 'number':
+            return _constant(value)
+        if kind == 'op' and value == '(':
+            node = self.expression()
+            self.expect(')')
+            return node
+        if kind == 'name':
+            following = self.peek()
+            if following[0] == 'op' and following[1] == '(':
+                return self.call(value, position)
+            if value in CONSTANTS:
+                return _constant(CONSTANTS[value])
+            if value in self.functions:
+                raise ExpressionError(f"{value} needs arguments in parentheses", position)
+            self.variables.add(value)
+            return lambda env: env[value]
+        found = 'end of expression' if kind == 'end' else repr(value)
+        raise ExpressionError(f"unexpected {found}", position)
+
+    def call(self, name, position):
+        function = self.functions.get(name)
+        if function is None:
+            raise ExpressionError(f"unknown function {name!r}", position)
+        self.expect('(')
+        arguments = [self.expression()]
+        while self.peek()[0] == 'op' and self.peek()[1] == ',':
+            self.take()
+            arguments.append(self.expression())
+        self.expect(')')
+
+        if all(_is_constant(argument) for argument in arguments):
+            return self._fold(function, *(argument.constant for argument in arguments))
+        if len(arguments) == 1:
+            argument = arguments[0]
+            return lambda env: function(argument(env))
+        return lambda env: function(*(argument(env) for argument in arguments))
+
+
+class CompiledExpression:
+    """A parsed expression, ready to evaluate against variable bindings"""
+
+    __slots__ = ('text', 'variables', '_node')
+
+    def __init__(self, text, functions=FUNCTIONS, number=None):
+        parser = Parser(text, functions, number)
+        self._node = parser.parse()
+        self.text = text
+        self.variables = frozenset(parser.variables)
+
+    def __call__(self, env=None, **variables):
+        if variables:
+            env = dict(env or {}, **variables)
+        try:
+            return self._node(env or {})
+        except KeyError as e:
+            raise NameError(f"variable {e.args[0]!r} has no value") from None
+
+    @property
+    def constant(self):
+        """True if the whole expression folded to a single value"""
+        return _is_constant(self._node)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text):
+    """Parse text once; repeated texts come from a bounded LRU cache"""
+    return CompiledExpression(text)
+
+
+def evaluate(text, env=None, **variables):
+    """Evaluate a complex expression such as '3+4i', '2(1-i)^2' or 'sqrt(z)*e^(iπ/4)'"""
+    return compile_expression(text)(env, **variables)
@@ -0,0 +1,144 @@
+import time
+import argparse
+from functools import lru_cache
+
+from complex_expr import CACHE_SIZE, CompiledExpression
+
+# Points evaluated per pass; every operation in an expression allocates a
+# temporary of this many complex128 values (16 bytes each)
+CHUNK_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=1)
+def numpy_functions():
+    """The calculator's function table with NumPy ufuncs in place of cmath"""
+    import numpy as np
+
+    def as_complex(function):
+        # Real inputs would give nan for sqrt(-1) or log(-1); cmath never does
+        return lambda z: function(np.asarray(z, dtype=np.complex128))
+
+    return {
+        'abs': np.abs,
+        'sqrt': as_complex(np.sqrt),
+        'exp': as_complex(np.exp),
+        'log': as_complex(np.log),
+        'log10': as_complex(np.log10),
+        'sin': as_complex(np.sin),
+        'cos': as_complex(np.cos),
+        'tan': as_complex(np.tan),
+        'sinh': as_complex(np.sinh),
+        'cosh': as_complex(np.cosh),
+        'tanh': as_complex(np.tanh),
+        'phase': np.angle,
+        'rect': lambda r, phi: np.asarray(r) * (np.cos(phi) + 1j * np.sin(phi)),
+        'conj': np.conjugate,
+        're': np.real,
+        'im': np.imag,
+        # polar() returns a pair, which has no place in a single result array
+    }
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def vectorize(text):
+    """Compile text so that variables may be bound to NumPy arrays
+
+    Constant parts that would raise when folded (1/0, 0^-1) are folded on
+    complex128 scalars instead, giving inf or nan like the array points do.
+    """
+    import numpy as np
+
+    with np.errstate(all='ignore'):
+        return CompiledExpression(text, numpy_functions(), np.complex128)
+
+
+def evaluate_array(text, env=None, chunk_size=CHUNK_SIZE, out=None, **variables):
+    """Evaluate text over arrays of variable values, broadcast together, a chunk at a time
+
+    Points where cmath would raise (1/z or log(z) at z=0, or a constant 1/0)
+    come out as inf or nan.
+    """
+    import numpy as np
+
+    expression = vectorize(text)
+    env = dict(env or {}, **variables)
+    names = sorted(expression.variables)
+    missing = [name for name in names if name not in env]
+    if missing:
+        raise NameError(f"variable {missing[0]!r} has no value")
+
+    arrays = np.broadcast_arrays(*(np.asarray(env[name], dtype=np.complex128) for name in names))
+    shape = arrays[0].shape if arrays else ()
+    if out is None:
+        out = np.empty(shape, dtype=np.complex128)
+    flat_out = out.reshape(-1)  # A view, so chunks land in out
+    flat = [array.reshape(-1) for array in arrays]
+
+    with np.errstate(all='ignore'):
+        for start in range(0, max(flat_out.size, 1), chunk_size):
+            stop = min(start + chunk_size, flat_out.size)
+            chunk = {name: array[start:stop] for name, array in zip(names, flat)}
+            flat_out[start:stop] = expression(chunk)
+    return out
+
+
+def evaluate_grid(text, real=(-2.0, 2.0), imag=(-2.0, 2.0), shape=(1000, 1000),
+                  variable='z', chunk_size=CHUNK_SIZE, out=None, **variables):
+    """Evaluate text at every point of a rectangular grid in the complex plane
+
+    Row 0 is imag[0] and column 0 is real[0]. Grid points are generated a
+    chunk of rows at a time, so memory beyond the result stays bounded.
+    """
+    import numpy as np
+
+    height, width = shape
+    expression = vectorize(text)
+    xs = np.linspace(real[0], real[1], width)
+    ys = np.linspace(imag[0], imag[1], height)
+    if out is None:
+        out = np.empty(shape, dtype=np.complex128)
+    rows = max(1, chunk_size // max(width, 1))
+
+    with np.errstate(all='ignore'):
+        for top in range(0, height, rows):
+            bottom = min(top + rows, height)
+            env = dict(variables)
+            env[variable] = xs[np.newaxis, :] + 1j * ys[top:bottom, np.newaxis]
+            out[top:bottom] = expression(env)
+    return out
+
+
+def parse_shape(text):
+    """'1920x1080' -> (1080, 1920) as (rows, columns)"""
+    width, _, height = text.lower().partition('x')
+    return int(height or width), int(width)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a calculator expression over a complex grid")
+    parser.add_argument('expression', help="e.g. '(z-1)/(z+1)' or '1/(z^2+0.2z+1)'")
+    parser.add_argument('--real', type=float, nargs=2, default=(-2.0, 2.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--imag', type=float, nargs=2, default=(-2.0, 2.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--size', default='1000x1000', help="WIDTHxHEIGHT points")
+    parser.add_argument('--variable', default='z', help="name bound to the grid points")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="points per vectorized pass")
+    parser.add_argument('-o', '--output', help="save the result array as .npy")
+    args = parser.parse_args()
+
+    import numpy as np
+
+    shape = parse_shape(args.size)
+    start = time.perf_counter()
+    result = evaluate_grid(args.expression, args.real, args.imag, shape,
+                           variable=args.variable, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    finite = np.isfinite(result)
+    print(f"[+] {result.size} points in {elapsed * 1000:.1f} ms "
+          f"({result.size / elapsed / 1e6:.1f} M points/s)")
+    if finite.any():
+        magnitude = np.abs(result[finite])
+        print(f"    |f| min {magnitude.min():.6g}, max {magnitude.max():.6g}; "
+              f"{result.size - finite.sum()} non-finite points")
+    if args.output:
+        np.save(args.output, result)
+        print(f"[+] Saved {args.output}")
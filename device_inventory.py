@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import sqlite3
+
+FIELDS = ('ip', 'hostname', 'mac', 'vendor', 'type')
+
+READ_CHUNK = 64 * 1024
+MAX_RECORD = 1024 * 1024  # A record still unparsed after this many characters is bad
+NEXT_RECORD = re.compile(r',\s*(?=\{)')
+
+SCHEMA = """
+-- key is the normalised MAC (see device_key), so the primary key is the MAC index
+CREATE TABLE IF NOT EXISTS devices (
+    key      TEXT PRIMARY KEY,
+    ip       TEXT,
+    hostname TEXT COLLATE NOCASE,
+    mac      TEXT COLLATE NOCASE,
+    vendor   TEXT,
+    type     TEXT COLLATE NOCASE,
+    extra    TEXT,
+    generation INTEGER  -- JSON import that last saw the device
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS devices_ip ON devices (ip);
+CREATE INDEX IF NOT EXISTS devices_hostname ON devices (hostname);
+CREATE INDEX IF NOT EXISTS devices_type ON devices (type);
+-- Static IPs handed out by IPAllocator, so a device keeps its suggestion
+-- from run to run; key is device_key, as in devices
+CREATE TABLE IF NOT EXISTS assignments (
+    key    TEXT PRIMARY KEY,
+    ip     TEXT NOT NULL,
+    prefix INTEGER NOT NULL  -- Subnet size the address was planned in
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def device_key(device):
+    """Devices are identified by MAC, or by IP when the MAC isn't known"""
+    mac = device.get('mac')
+    if mac and mac != 'Unknown':
+        return mac.lower().replace('-', ':')
+    return f"ip:{device.get('ip')}"
+
+
+def _check_record(record):
+    if not isinstance(record, dict):
+        return f"expected an object, got {type(record).__name__}"
+    if not record.get('ip') and not record.get('mac'):
+        return "record has neither 'ip' nor 'mac'"
+    return None
+
+
+def _iter_ndjson(f, on_error):
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            on_error(line_number, e.msg if hasattr(e, 'msg') else str(e))
+            continue
+        problem = _check_record(record)
+        if problem:
+            on_error(line_number, problem)
+        else:
+            yield record
+
+
+def _iter_array(f, on_error):
+    """Decode a JSON array one element at a time from fixed-size reads"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_CHUNK)
+    position = buffer.index('[') + 1
+    line_base = 1  # Line number of buffer[0]
+    eof = False
+
+    while True:
+        # Keep at least one whole record's worth of text ahead of position
+        if not eof and len(buffer) - position < READ_CHUNK:
+            line_base += buffer.count('\n', 0, position)
+            buffer = buffer[position:]
+            position = 0
+            chunk = f.read(READ_CHUNK)
+            eof = not chunk
+            buffer += chunk
+
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                on_error(line_base + buffer.count('\n', 0, position), "missing closing ']'")
+                return
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            error_at = getattr(e, 'pos', position)
+            truncated = (error_at > len(buffer) - 8
+                         or getattr(e, 'msg', '').startswith('Unterminated string'))
+            if not eof and truncated and len(buffer) - position < MAX_RECORD:
+                # Cut off by the read rather than broken; fetch more and retry
+                line_base += buffer.count('\n', 0, position)
+                buffer = buffer[position:] + f.read(READ_CHUNK)
+                position = 0
+                continue
+            on_error(line_base + buffer.count('\n', 0, error_at), getattr(e, 'msg', str(e)))
+            # Resynchronise on the next element that starts an object
+            match = NEXT_RECORD.search(buffer, max(position + 1, error_at))
+            if match is None:
+                if not eof:
+                    # Drop the damaged text and look further on
+                    line_base += buffer.count('\n')
+                    buffer, position = '', 0
+                    continue
+                return
+            position = match.end()
+            continue
+
+        problem = _check_record(record)
+        if problem:
+            on_error(line_base + buffer.count('\n', 0, position), problem)
+        else:
+            yield record
+        position = end
+
+
+def iter_json_devices(filename, on_error=None):
+    """Yield device dicts from a JSON array or newline-delimited JSON file, lazily
+
+    Records that don't parse, or aren't devices, are passed to
+    on_error(line number, message) and skipped; the rest of the file is
+    still read.
+    """
+    if on_error is None:
+        def on_error(line, message):
+            pass
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        start = f.read(READ_CHUNK).lstrip()[:1]
+        f.seek(0)
+        if start == '[':
+            yield from _iter_array(f, on_error)
+        elif start == '{':
+            yield from _iter_ndjson(f, on_error)
+        elif start:
+            raise ValueError(f"{filename} is neither a JSON array nor JSON Lines")
+
+
+class Device:
+    """One inventory record; reads like the device dicts it replaces"""
+
+    __slots__ = ('ip', 'hostname', 'mac', 'vendor', 'type', '_extra')
+
+    def __init__(self, ip=None, hostname=None, mac=None, vendor=None, type=None, extra=None):
+        self.ip = ip
+        self.hostname = hostname
+        self.mac = mac
+        self.vendor = vendor
+        self.type = type
+        self._extra = extra  # Any other fields, as JSON text, decoded on demand
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            value = getattr(self, key)
+        elif self._extra:
+            value = json.loads(self._extra).get(key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self):
+        device = json.loads(self._extra) if self._extra else {}
+        device.update((field, getattr(self, field)) for field in FIELDS
+                      if getattr(self, field) is not None)
+        return device
+
+    def __repr__(self):
+        return f"Device(ip={self.ip!r}, hostname={self.hostname!r}, mac={self.mac!r}, type={self.type!r})"
+
+
+def _row(device):
+    """(key, ip, hostname, mac, vendor, type, extra) for a device dict"""
+    extra = {key: value for key, value in device.items() if key not in FIELDS}
+    return (device_key(device),
+            *(None if device.get(field) is None else str(device.get(field)) for field in FIELDS),
+            json.dumps(extra) if extra else None)
+
+
+class DeviceInventory:
+    """SQLite-backed device store with indexes by MAC, IP, hostname and type"""
+
+    def __init__(self, path="network_devices.db"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(devices)")}
+        if 'generation' not in columns:
+            # Inventories created before imports removed stale devices
+            with self.db:
+                self.db.execute("ALTER TABLE devices ADD COLUMN generation INTEGER")
+
+    def close(self):
+        self.db.close()
+
+    def upsert(self, devices, batch_size=10_000):
+        """Insert or update devices (dicts) by key; returns the number written"""
+        with self.db:
+            return self._upsert(devices, None, batch_size)
+
+    def _upsert(self, devices, generation, batch_size=10_000):
+        """upsert() without its own transaction"""
+        # Fields a device doesn't carry keep their stored values, so a
+        # partial record (say, from a router's DHCP table) refreshes
+        # ip/hostname without erasing vendor and type
+        sql = ("INSERT INTO devices (key, ip, hostname, mac, vendor, type, extra, generation) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+               "ip=COALESCE(excluded.ip, ip), hostname=COALESCE(excluded.hostname, hostname), "
+               "mac=COALESCE(excluded.mac, mac), vendor=COALESCE(excluded.vendor, vendor), "
+               "type=COALESCE(excluded.type, type), "
+               "extra=COALESCE(json_patch(extra, excluded.extra), excluded.extra, extra), "
+               "generation=COALESCE(excluded.generation, generation)")
+        count = 0
+        batch = []
+        for device in devices:
+            batch.append((*_row(device), generation))
+            if len(batch) == batch_size:
+                self.db.executemany(sql, batch)
+                count += len(batch)
+                batch.clear()
+        self.db.executemany(sql, batch)
+        count += len(batch)
+        return count
+
+    def remove(self, device):
+        with self.db:
+            self.db.execute("DELETE FROM devices WHERE key = ?", (device_key(device),))
+
+    def import_json(self, filename, force=False, on_error=None):
+        """Load a network_devices.json export (or JSON Lines), skipping it if it hasn't changed
+
+        The file is the source of truth: devices no longer in it are
+        removed. Returns the number of devices imported, or None if the
+        import was skipped. Bad records go to on_error(line number, message).
+        """
+        stat = os.stat(filename)
+        stamp = f"{os.path.abspath(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+        previous = self.db.execute("SELECT value FROM meta WHERE name = 'json_import'").fetchone()
+        if not force and previous and previous[0] == stamp:
+            return None
+
+        # One transaction: a file that fails to read part way removes nothing
+        with self.db:
+            generation = self.db.execute(
+                "SELECT COALESCE(MAX(generation), 0) + 1 FROM devices").fetchone()[0]
+            count = self._upsert(iter_json_devices(filename, on_error), generation)
+            self.db.execute("DELETE FROM devices WHERE generation IS NOT ?", (generation,))
+            self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('json_import', ?)", (stamp,))
+        return count
+
+    def assignments(self, prefix):
+        """(key, ip) pairs of the static IPs planned in /prefix subnets"""
+        return self.db.execute("SELECT key, ip FROM assignments WHERE prefix = ?", (prefix,))
+
+    def save_assignments(self, assignments, prefix):
+        """Store (key, ip) pairs planned in /prefix subnets, replacing older ones"""
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO assignments (key, ip, prefix) VALUES (?, ?, ?)",
+                                ((key, ip, prefix) for key, ip in assignments))
+
+    def export_json(self, filename):
+        """Write the inventory back out in the network_devices.json format"""
+        with open(filename, 'w') as f:
+            f.write("[")
+            for i, device in enumerate(self):
+                f.write(",\n  " if i else "\n  ")
+                f.write(json.dumps(device.to_dict()))
+            f.write("\n]\n")
+
+    def _select(self, where="", parameters=()):
+        cursor = self.db.execute(
+            f"SELECT ip, hostname, mac, vendor, type, extra FROM devices {where}", parameters)
+        for row in cursor:
+            yield Device(*row)
+
+    def __iter__(self):
+        return self._select()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def by_mac(self, mac):
+        """The device with this MAC, or None"""
+        return next(self._select("WHERE key = ?", (device_key({'mac': mac}),)), None)
+
+    def by_ip(self, ip):
+        return list(self._select("WHERE ip = ?", (ip,)))
+
+    def by_hostname(self, hostname):
+        return list(self._select("WHERE hostname = ?", (hostname,)))
+
+    def by_type(self, device_type):
+        return list(self._select("WHERE type = ?", (device_type,)))
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import asyncio
+import argparse
+
+from latency import LatencyProber, iter_hosts, count_hosts
+from resolver import ReverseResolver
+from oui_index import OuiIndex
+
+# Ports tried for TCP-connect discovery; a refused connection also proves the host is up
+DISCOVERY_PORTS = (80, 443, 22, 445, 139, 53, 8080, 3389, 62078)
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_HEADER = struct.Struct('!BBHHH')  # Type, code, checksum, identifier, sequence
+ICMP_RCVBUF = 4 * 1024 * 1024
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class ArpTable:
+    """IP -> MAC from the kernel neighbour table, re-read at most once a second"""
+
+    def __init__(self, path='/proc/net/arp', max_age=1.0):
+        self.path = path
+        self.max_age = max_age
+        self.entries = {}
+        self._read_at = 0.0
+
+    def lookup(self, ip):
+        now = time.monotonic()
+        if now - self._read_at > self.max_age:
+            self._read_at = now
+            self.entries = self._read()
+        return self.entries.get(ip)
+
+    def _read(self):
+        entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                next(f, None)  # Header
+                for line in f:
+                    fields = line.split()
+                    # Flags 0x0 means the entry is incomplete
+                    if len(fields) >= 4 and fields[2] != '0x0' and fields[3] != '00:00:00:00:00:00':
+                        entries[fields[0]] = fields[3]
+        except OSError:
+            pass
+        return entries
+
+
+class IcmpPinger:
+    """ICMP echo over a single socket; replies are matched back to the waiting probe"""
+
+    def __init__(self, sock, raw):
+        self.sock = sock
+        self.raw = raw                  # Raw sockets see the IP header and every ICMP packet
+        self.identifier = os.getpid() & 0xFFFF
+        self._sequence = 0
+        self._waiting = {}              # (address, sequence) -> future
+        self._loop = None
+
+    @classmethod
+    def open(cls):
+        """Unprivileged ping socket if the kernel allows it, else raw if we are privileged, else None"""
+        for kind, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+            try:
+                sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            except (PermissionError, OSError):
+                continue
+            sock.setblocking(False)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, ICMP_RCVBUF)
+            except OSError:
+                pass
+            return cls(sock, raw)
+        return None
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+    def _on_readable(self):
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+            if self.raw:
+                packet = packet[(packet[0] & 0x0F) * 4:]  # Strip the IP header
+            if len(packet) < ICMP_HEADER.size:
+                continue
+            kind, _, _, identifier, sequence = ICMP_HEADER.unpack_from(packet)
+            if kind != ICMP_ECHO_REPLY or (self.raw and identifier != self.identifier):
+                continue
+            future = self._waiting.pop((address[0], sequence), None)
+            if future is not None and not future.done():
+                future.set_result(time.perf_counter_ns())
+
+    async def ping(self, host, timeout):
+        """Seconds until host answers an echo request, or None"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            loop.add_reader(self.sock.fileno(), self._on_readable)
+
+        # Sequence numbers only need to be unique among probes in flight
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        sequence = self._sequence
+        payload = struct.pack('!Q', time.time_ns())
+        header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        packet = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum(header + payload),
+                                  self.identifier, sequence) + payload
+
+        future = loop.create_future()
+        key = (host, sequence)
+        self._waiting[key] = future
+        start = time.perf_counter_ns()
+        try:
+            await loop.sock_sendto(self.sock, packet, (host, 0))
+            received = await asyncio.wait_for(future, timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            self._waiting.pop(key, None)
+        return (received - start) / 1e9
+
+
+class HostDiscovery:
+    """Sweep address ranges for live hosts with bounded concurrency"""
+
+    def __init__(self, concurrency=512, timeout=1.0, ports=DISCOVERY_PORTS, icmp=True,
+                 resolve=True, resolve_timeout=1.0, resolver=None, vendors=None):
+        self.concurrency = concurrency          # Hosts probed at the same time
+        self.timeout = timeout                  # Seconds before a probe gives up
+        # Shared PTR resolver; rescans of a subnet answer from its cache
+        if resolver is None and resolve:
+            resolver = ReverseResolver(timeout=resolve_timeout)
+        self.resolver = resolver if resolve else None
+        self.vendors = vendors                  # OuiIndex, None to leave vendors 'Unknown'
+        self.icmp_head_start = min(0.1, timeout / 4)  # Seconds ICMP gets before TCP probes start
+        self.prober = LatencyProber(count=1, timeout=timeout, ports=ports)
+        self.pinger = IcmpPinger.open() if icmp else None
+        self.arp = ArpTable()
+        self.probed = 0
+
+    def close(self):
+        if self.pinger is not None:
+            self.pinger.close()
+            self.pinger = None
+        if self.resolver is not None:
+            self.resolver.close()
+
+    async def _tcp(self, host):
+        port, rtt = await self.prober.find_port(host)
+        return ('tcp', rtt, port) if port is not None else None
+
+    async def _icmp(self, host):
+        rtt = await self.pinger.ping(host, self.timeout)
+        return ('icmp', rtt, None) if rtt is not None else None
+
+    async def probe(self, host):
+        """A device dict if host answers ICMP or TCP, otherwise None"""
+        answer = None
+        pending = set()
+        if self.pinger is not None and ':' not in host:
+            # One echo request is far cheaper than a TCP connect per port,
+            # so give ICMP a head start before falling back to both
+            icmp = asyncio.ensure_future(self._icmp(host))
+            pending.add(icmp)
+            await asyncio.wait(pending, timeout=self.icmp_head_start)
+            if icmp.done():
+                pending.discard(icmp)
+                answer = icmp.result()
+        if answer is None:
+            pending.add(asyncio.ensure_future(self._tcp(host)))
+
+        try:
+            while pending and answer is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if answer is None and finished.result() is not None:
+                        answer = finished.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        self.probed += 1
+        if answer is None:
+            return None
+
+        method, rtt, port = answer
+        mac = self.arp.lookup(host)
+        return {
+            'ip': host,
+            'hostname': (await self.resolver.aresolve(host) if self.resolver else None) or 'Unknown',
+            'mac': mac or 'Unknown',
+            'vendor': (self.vendors.lookup(mac) if self.vendors and mac else None) or 'Unknown',
+            'type': 'Unknown',
+            'status': 'up',
+            'method': method,
+            'port': port,
+            'rtt_ms': round(rtt * 1000, 3),
+        }
+
+    async def discover(self, targets):
+        """Yield a device dict for every live host as soon as it answers"""
+        hosts = iter_hosts(targets)
+        found = asyncio.Queue()
+        done = object()
+
+        async def worker():
+            # Workers share one lazy host iterator, so a /8 never sits in memory
+            for host in hosts:
+                device = await self.probe(host)
+                if device is not None:
+                    await found.put(device)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+
+        async def finish():
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                await found.put(done)
+
+        finisher = asyncio.ensure_future(finish())
+        try:
+            while True:
+                device = await found.get()
+                if device is done:
+                    break
+                yield device
+            await finisher  # Re-raise a worker's exception
+        finally:
+            for task in workers + [finisher]:
+                task.cancel()
+
+    def run(self, targets, callback=None):
+        """Sweep targets and return the live devices, calling callback(device) as each is found"""
+        async def collect():
+            devices = []
+            async for device in self.discover(targets):
+                if callback is not None:
+                    callback(device)
+                devices.append(device)
+            return devices
+
+        try:
+            return asyncio.run(collect())
+        finally:
+            self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent host discovery (ICMP and TCP connect)")
+    parser.add_argument('targets', nargs='+', help="CIDR blocks, addresses or hostnames")
+    parser.add_argument('-c', '--concurrency', type=int, default=512, help="hosts probed at once")
+    parser.add_argument('-t', '--timeout', type=float, default=1.0, help="probe timeout in seconds")
+    parser.add_argument('-p', '--ports', default=','.join(map(str, DISCOVERY_PORTS)),
+                        help="TCP ports to try, comma separated")
+    parser.add_argument('--no-icmp', action='store_true', help="TCP connect probes only")
+    parser.add_argument('-n', '--no-resolve', action='store_true', help="skip reverse DNS")
+    parser.add_argument('--dns-cache', default='dns_cache.json',
+                        help="reverse DNS cache kept between scans ('' to disable)")
+    parser.add_argument('--oui-index', default="oui.idx",
+                        help="compiled vendor index (see oui_index.py compile); used if present")
+    parser.add_argument('-o', '--output', help="append devices as JSON Lines (NetworkManager can import it)")
+    args = parser.parse_args()
+
+    # -n skips the resolver entirely: no thread pool, no cache file read or written
+    resolver = None if args.no_resolve else ReverseResolver(cache_path=args.dns_cache or None)
+    discovery = HostDiscovery(concurrency=args.concurrency, timeout=args.timeout,
+                              ports=[int(port) for port in args.ports.split(',')],
+                              icmp=not args.no_icmp, resolve=not args.no_resolve,
+                              resolver=resolver,
+                              vendors=OuiIndex(args.oui_index) if os.path.exists(args.oui_index) else None)
+    methods = "ICMP + TCP connect" if discovery.pinger else "TCP connect (ICMP needs privileges)"
+    print(f"\nScanning {count_hosts(args.targets)} addresses with {methods}...")
+
+    output = open(args.output, 'a') if args.output else None
+
+    def found(device):
+        print(f"Found: {device['ip']} - {device['hostname']} "
+              f"({device['method']}, {device['rtt_ms']:.1f} ms)")
+        if output:
+            output.write(json.dumps(device) + '\n')
+
+    start = time.monotonic()
+    try:
+        devices = discovery.run(args.targets, found)
+    except KeyboardInterrupt:
+        print("\n[-] Scan interrupted", file=sys.stderr)
+        devices = None
+    finally:
+        if output:
+            output.close()
+    if devices is not None:
+        print(f"\nScan complete! {len(devices)} of {discovery.probed} hosts up "
+              f"in {time.monotonic() - start:.1f} s")
@@ -1,17 +1,58 @@
-import json
+import os
+import argparse
 import webbrowser
-from datetime import datetime
+
+from device_inventory import DeviceInventory, device_key
+from ip_allocator import IPAllocator, DEFAULT_RANGES
+from resolver import ReverseResolver, fill_hostnames
+from oui_index import OuiIndex
+from network_report import iter_report_rows, write_html_report, write_csv_report, write_jsonl_report
+
+# Bad inventory records printed individually before only the total is shown
+MAX_REPORTED_ERRORS = 20
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
 
 class NetworkManager:
-    def __init__(self, devices_file="network_devices.json"):
-        self.devices = self.load_devices(devices_file)
+    def __init__(self, devices_file="network_devices.json", inventory_file=None, prefix=24,
+                 ip_ranges=DEFAULT_RANGES, resolver=None, vendors=None):
+        self.devices = self.load_devices(devices_file, inventory_file)
+        self.resolver = resolver      # ReverseResolver for 'Unknown' hostnames, None to skip
+        self.vendors = vendors        # OuiIndex for 'Unknown' vendors, None to skip
+        self.prefix = prefix          # Subnet size static IPs are planned in
+        self.ip_ranges = ip_ranges    # Per-type address ranges, as /24 host offsets
+        self._allocator = None
+        self._saved = {}              # Device key -> assignment stored in the inventory
+        self._unsaved = []            # (key, ip) assignments not stored yet
+        
+    def load_devices(self, filename, inventory_file=None):
+        """Open the device inventory, importing the JSON export if it changed since last time"""
+        if filename.endswith('.db'):
+            return DeviceInventory(filename)
+        
+        inventory = DeviceInventory(inventory_file or os.path.splitext(filename)[0] + '.db')
+        errors = []
+        
+        def report(line, message):
+            errors.append(line)
+            if len(errors) <= MAX_REPORTED_ERRORS:
+                print(f"[-] {filename} line {line}: {message}")
         
-    def load_devices(self, filename):
         try:
-            with open(filename, 'r') as f:
-                return json.load(f)
-        except:
-            return []
+            count = inventory.import_json(filename, on_error=report)
+        except (OSError, ValueError) as e:
+            print(f"[-] Could not read {filename}: {e}")
+            return inventory
+        if count is not None:
+            skipped = f", skipped {len(errors)} bad records" if errors else ""
+            print(f"[+] Imported {count} devices from {filename}{skipped}")
+        return inventory
     
     def generate_router_config_guide(self):
         """Generate instructions for router configuration"""
@@ -21,99 +62,113 @@ class NetworkManager:
         print("=" * 80)
         
         for device in self.devices:
+            suggested_ip = self.suggest_static_ip(device)
             print(f"\nDevice: {device.get('hostname', 'Unknown')}")
             print(f"  MAC Address: {device.get('mac', 'Unknown')}")
             print(f"  Current IP: {device.get('ip', 'Unknown')}")
-            print(f"  Suggested Static IP: {self.suggest_static_ip(device)}")
+            print(f"  Suggested Static IP: {suggested_ip}")
             print(f"  Steps to configure in router:")
             print(f"    1. Login to router admin panel")
             print(f"    2. Find 'DHCP Reservation' or 'Static DHCP'")
             print(f"    3. Add new entry with MAC above")
-            print(f"    4. Assign IP: {self.suggest_static_ip(device)}")
+            print(f"    4. Assign IP: {suggested_ip}")
             print(f"    5. Save and reboot if required")
     
+    @property
+    def allocator(self):
+        """IP allocator holding earlier runs' assignments, then every address in use, reserved"""
+        if self._allocator is None:
+            self._allocator = IPAllocator(self.prefix, self.ip_ranges)
+            # Stored assignments go first so they win over the inventory's
+            # current addresses, whatever order the devices come in
+            for key, ip in self.devices.assignments(self.prefix):
+                self._allocator.restore(key, ip)
+                self._saved[key] = ip
+            for device in self.devices:
+                self._allocator.reserve(device.get('ip'), device_key(device))
+        return self._allocator
+    
     def suggest_static_ip(self, device):
-        """Suggest a static IP based on device type"""
+        """Suggest a conflict-free static IP from the device type's range, the same one every run"""
         current_ip = device.get('ip', '192.168.1.100')
-        base = '.'.join(current_ip.split('.')[:3])
-        
-        # IP allocation ranges
-        device_type = device.get('type', '').lower()
-        
-        if 'router' in device_type:
-            return f"{base}.1"
-        elif 'server' in device_type or 'nas' in device_type:
-            return f"{base}.10"
-        elif 'printer' in device_type:
-            return f"{base}.20"
-        elif 'camera' in device_type:
-            return f"{base}.30"
-        elif 'iot' in device_type or 'smart' in device_type:
-            return f"{base}.40"
-        elif 'phone' in device_type:
-            return f"{base}.50"
-        elif 'pc' in device_type or 'laptop' in device_type:
-            return f"{base}.100"
-        else:
-            return current_ip  # Keep current IP
+        key = device_key(device)
+        suggested = self.allocator.assign(key, current_ip, device.get('type', ''))
+        if self._saved.get(key) != suggested and self.allocator.assignments.get(key) == suggested:
+            self._saved[key] = suggested
+            self._unsaved.append((key, suggested))
+            if len(self._unsaved) >= 10_000:
+                self.save_assignments()
+        return suggested
     
-    def generate_html_report(self):
-        """Generate an HTML report of network devices"""
-        html = """
-        <html>
-        <head>
-            <title>Network Devices Report</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 40px; }
-                table { border-collapse: collapse; width: 100%; }
-                th, td { border: 1px solid #ddd; padding: 12px; text-align: left; }
-                th { background-color: #4CAF50; color: white; }
-                tr:nth-child(even) { background-color: #f2f2f2; }
-                .warning { color: #ff0000; font-weight: bold; }
-            </style>
-        </head>
-        <body>
-            <h1>Network Devices Inventory</h1>
-            <p>Generated: """ + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + """</p>
-            <table>
-                <tr>
-                    <th>IP Address</th>
-                    <th>Hostname</th>
-                    <th>MAC Address</th>
-                    <th>Vendor</th>
-                    <th>Type</th>
-                    <th>Suggested Static IP</th>
-                </tr>
-        """
-        
-        for device in self.devices:
-            html += f"""
-                <tr>
-                    <td>{device.get('ip', 'N/A')}</td>
-                    <td>{device.get('hostname', 'Unknown')}</td>
-                    <td>{device.get('mac', 'Unknown')}</td>
-                    <td>{device.get('vendor', 'Unknown')}</td>
-                    <td>{device.get('type', 'Unknown')}</td>
-                    <td>{self.suggest_static_ip(device)}</td>
-                </tr>
-            """
-        
-        html += """
-            </table>
-            <p class="warning">Note: To change IP addresses, configure DHCP reservations in your router.</p>
-            <p>Router Access: Usually http://192.168.1.1 or http://192.168.0.1</p>
-        </body>
-        </html>
-        """
-        
-        with open("network_report.html", "w") as f:
-            f.write(html)
+    def save_assignments(self):
+        """Store new static IP assignments in the inventory"""
+        if self._unsaved:
+            self.devices.save_assignments(self._unsaved, self.prefix)
+            self._unsaved.clear()
+    
+    def close(self):
+        self.save_assignments()
+        self.devices.close()
+    
+    def iter_report_rows(self):
+        """Report rows for every device, produced one at a time"""
+        devices = self.devices
+        if self.resolver is not None:
+            devices = fill_hostnames(devices, self.resolver)
+        if self.vendors is not None:
+            devices = self.vendors.annotate(devices)
+        return iter_report_rows(devices, self.suggest_static_ip)
+    
+    def generate_html_report(self, filename="network_report.html", page_size=5000, open_browser=True):
+        """Generate an HTML report of network devices, split into pages of page_size rows"""
+        paths = write_html_report(self.iter_report_rows(), filename, page_size, total=len(self.devices))
         
-        webbrowser.open("network_report.html")
-        print("[+] HTML report generated: network_report.html")
+        if open_browser:
+            webbrowser.open(paths[0])
+        pages = f" ({len(paths)} pages)" if len(paths) > 1 else ""
+        print(f"[+] HTML report generated: {filename}{pages}")
+        return paths
+    
+    def generate_csv_report(self, filename="network_report.csv"):
+        """Generate a CSV report of network devices"""
+        count = write_csv_report(self.iter_report_rows(), filename)
+        print(f"[+] CSV report generated: {filename} ({count} devices)")
+        return filename
+    
+    def generate_jsonl_report(self, filename="network_report.jsonl"):
+        """Generate a JSON Lines report of network devices, one device per line"""
+        count = write_jsonl_report(self.iter_report_rows(), filename)
+        print(f"[+] JSON Lines report generated: {filename} ({count} devices)")
+        return filename
 
 # Usage
 if __name__ == "__main__":
-    manager = NetworkManager()
-    manager.generate_router_config_guide()
-    manager.generate_html_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Network device reports")
+    parser.add_argument('devices_file', nargs='?', default="network_devices.json",
+                        help="JSON export to import, or a .db inventory")
+    parser.add_argument('--format', choices=('html', 'csv', 'jsonl'), default='html')
+    parser.add_argument('--output', help="report file (default: network_report.<format>)")
+    parser.add_argument('--page-size', type=positive_int, default=5000, help="HTML rows per page")
+    parser.add_argument('--prefix', type=int, default=24, help="subnet prefix length to plan static IPs in")
+    parser.add_argument('--no-guide', action='store_true', help="skip the router configuration guide")
+    parser.add_argument('--no-browser', action='store_true', help="don't open the HTML report")
+    parser.add_argument('--resolve', action='store_true', help="look up 'Unknown' hostnames (reverse DNS)")
+    parser.add_argument('--oui-index', default="oui.idx",
+                        help="compiled vendor index (see oui_index.py compile); used if present")
+    args = parser.parse_args()
+    
+    resolver = ReverseResolver(cache_path="dns_cache.json") if args.resolve else None
+    vendors = OuiIndex(args.oui_index) if os.path.exists(args.oui_index) else None
+    manager = NetworkManager(args.devices_file, prefix=args.prefix, resolver=resolver, vendors=vendors)
+    if not args.no_guide:
+        manager.generate_router_config_guide()
+    output = args.output or f"network_report.{args.format}"
+    if args.format == 'html':
+        manager.generate_html_report(output, args.page_size, open_browser=not args.no_browser)
+    elif args.format == 'csv':
+        manager.generate_csv_report(output)
+    else:
+        manager.generate_jsonl_report(output)
+    manager.close()
+    if resolver is not None:
+        resolver.close()
\ No newline at end of file
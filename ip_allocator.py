@@ -0,0 +1,182 @@
+import socket
+
+# (type keywords, first, last) host offsets within a /24; checked in order.
+# Other subnet sizes scale each range to the same share of the subnet, e.g.
+# servers get .10.0-.19.255 in a /16 and .2-.4 in a /26.
+DEFAULT_RANGES = (
+    (('router',), 1, 1),
+    (('server', 'nas'), 10, 19),
+    (('printer',), 20, 29),
+    (('camera',), 30, 39),
+    (('iot', 'smart'), 40, 49),
+    (('phone',), 50, 99),
+    (('pc', 'laptop'), 100, 199),
+)
+
+
+def ip_to_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+
+class SubnetBitmap:
+    """Used/free bit per address of one subnet, with a free-search cursor per range"""
+
+    __slots__ = ('network', 'size', 'bits', 'cursors')
+
+    def __init__(self, network, size):
+        self.network = network  # Network address as an int
+        self.size = size
+        self.bits = bytearray((size + 7) // 8)
+        self.cursors = {}       # (first, last) -> lowest offset that may be free
+
+    def is_used(self, offset):
+        return self.bits[offset >> 3] >> (offset & 7) & 1
+
+    def mark(self, offset):
+        self.bits[offset >> 3] |= 1 << (offset & 7)
+
+    def clear(self, offset):
+        self.bits[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+        for (first, last), cursor in self.cursors.items():
+            if first <= offset < cursor:
+                self.cursors[first, last] = offset
+
+    def allocate(self, first, last):
+        """Mark and return the lowest free offset in [first, last], or None
+
+        The cursor only moves forward until something is released, so a
+        run of allocations scans each address once.
+        """
+        bits = self.bits
+        offset = self.cursors.get((first, last), first)
+        while offset <= last:
+            if offset & 7 == 0 and bits[offset >> 3] == 0xFF:
+                offset += 8  # Whole byte taken
+                continue
+            if not bits[offset >> 3] >> (offset & 7) & 1:
+                self.mark(offset)
+                self.cursors[first, last] = offset + 1
+                return offset
+            offset += 1
+        self.cursors[first, last] = offset
+        return None
+
+
+class IPAllocator:
+    """Hand out conflict-free static IPs from per-type ranges, remembered per MAC"""
+
+    def __init__(self, prefix=24, ranges=DEFAULT_RANGES):
+        if not 8 <= prefix <= 30:
+            raise ValueError(f"prefix must be between /8 and /30, got /{prefix}")
+        self.prefix = prefix
+        self.size = 1 << (32 - prefix)
+        self.ranges = [(keywords, *self._scale(first, last)) for keywords, first, last in ranges]
+        self.subnets = {}      # Network address int -> SubnetBitmap
+        self.owners = {}       # Address int -> key of the device using it
+        self.assignments = {}  # Device key -> assigned address string
+        self._type_ranges = {}
+
+    def _scale(self, first, last):
+        """Map a /24 host range onto this prefix, clipped to usable addresses
+
+        Single addresses (the router) stay put. A range whose share of a small
+        subnet holds no address, like servers in a /30, gets every usable
+        address after the router instead; the bitmap still prevents conflicts.
+        """
+        if first == last:
+            return max(1, first), min(last, self.size - 2)
+        low = 2 if first > 1 else 1  # Keep clear of the router at .1
+        first = max(low, first * self.size // 256)
+        last = min((last + 1) * self.size // 256 - 1, self.size - 2)
+        if first > last:
+            return low, self.size - 2
+        return first, last
+
+    def _subnet(self, address):
+        network = address & ~(self.size - 1) & 0xFFFFFFFF
+        subnet = self.subnets.get(network)
+        if subnet is None:
+            subnet = self.subnets[network] = SubnetBitmap(network, self.size)
+            subnet.mark(0)              # Network address
+            subnet.mark(self.size - 1)  # Broadcast address
+        return subnet
+
+    def range_for(self, device_type):
+        """(first, last) offsets for a device type, or None to keep its current IP"""
+        try:
+            return self._type_ranges[device_type]
+        except KeyError:
+            pass
+        span = None
+        lowered = (device_type or '').lower()
+        for keywords, first, last in self.ranges:
+            if any(keyword in lowered for keyword in keywords):
+                span = (first, last)
+                break
+        self._type_ranges[device_type] = span  # Inventories hold few distinct types
+        return span
+
+    def reserve(self, ip, key=None):
+        """Mark an address in use, e.g. one a device already holds"""
+        try:
+            address = ip_to_int(ip)
+        except (OSError, TypeError):
+            return
+        self._subnet(address).mark(address & (self.size - 1))
+        if key is not None:
+            self.owners.setdefault(address, key)
+
+    def restore(self, key, ip):
+        """Take back an assignment from an earlier run; call before reserve() and assign()"""
+        try:
+            address = ip_to_int(ip)
+        except (OSError, TypeError):
+            return
+        self._subnet(address).mark(address & (self.size - 1))
+        self.owners[address] = key
+        self.assignments[key] = ip
+
+    def assign(self, key, ip, device_type):
+        """Static IP for a device: memoized, its current IP if that already fits, else the next free one"""
+        assigned = self.assignments.get(key)
+        if assigned is not None:
+            return assigned
+
+        span = self.range_for(device_type)
+        try:
+            address = ip_to_int(ip)
+        except (OSError, TypeError):
+            return ip
+        if span is None:
+            return ip  # Keep current IP
+        subnet = self._subnet(address)
+        offset = address & (self.size - 1)
+        first, last = span
+
+        if first <= offset <= last and self.owners.get(address, key) == key:
+            # Already in its range and nobody else's: no need to move it
+            subnet.mark(offset)
+            self.owners[address] = key
+            assigned = ip
+        else:
+            free = subnet.allocate(first, last)
+            if free is None:
+                return ip  # Range full; keep the current IP rather than collide
+            self.owners[subnet.network + free] = key
+            assigned = int_to_ip(subnet.network + free)
+        self.assignments[key] = assigned
+        return assigned
+
+    def release(self, key):
+        """Return a device's assigned address to the pool"""
+        assigned = self.assignments.pop(key, None)
+        if assigned is None:
+            return
+        address = ip_to_int(assigned)
+        if self.owners.get(address) == key:
+            del self.owners[address]
+            self._subnet(address).clear(address & (self.size - 1))
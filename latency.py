@@ -0,0 +1,241 @@
+import asyncio
+import socket
+import struct
+import statistics
+import math
+import time
+import ipaddress
+import argparse
+
+# Ports tried for TCP-connect RTT. Any answer counts, including a refused
+# connection: the RST comes back from the host just as fast as a SYN/ACK.
+DEFAULT_PORTS = (80, 443, 22)
+UDP_PROBE = struct.Struct('!IQ')  # Sequence number, send time (ns)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def iter_hosts(targets):
+    """Lazily yield the host addresses of CIDR blocks, single addresses and hostnames"""
+    for target in targets:
+        try:
+            network = ipaddress.ip_network(target, strict=False)
+        except ValueError:
+            yield target
+            continue
+        if network.num_addresses == 1:
+            yield str(network.network_address)
+        else:
+            for host in network.hosts():
+                yield str(host)
+
+
+def count_hosts(targets):
+    """How many addresses iter_hosts(targets) yields, without listing them"""
+    total = 0
+    for target in targets:
+        try:
+            network = ipaddress.ip_network(target, strict=False)
+        except ValueError:
+            total += 1
+            continue
+        if network.num_addresses <= 2:
+            total += network.num_addresses
+        else:
+            # hosts() drops network and broadcast for IPv4, only the
+            # Subnet-Router anycast address for IPv6
+            total += network.num_addresses - (1 if network.version == 6 else 2)
+    return total
+
+
+class LatencyProber:
+    """Measure TCP-connect (and optionally UDP echo) RTT to many hosts at once"""
+
+    def __init__(self, count=4, interval=0.2, timeout=1.0, ports=DEFAULT_PORTS,
+                 udp_port=None, concurrency=256):
+        self.count = count              # Probes per host
+        self.interval = interval        # Seconds between probe starts to one host
+        self.timeout = timeout          # Seconds before a probe counts as lost
+        self.ports = tuple(ports)
+        self.udp_port = udp_port        # UDP echo port (7), None to skip UDP
+        self.concurrency = concurrency  # Hosts probed at the same time
+
+    async def tcp_rtt(self, host, port):
+        """Seconds until the host answers a TCP connect, or None if it doesn't"""
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        start = time.perf_counter_ns()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (host, port)), self.timeout)
+        except ConnectionRefusedError:
+            pass
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            sock.close()
+        return (time.perf_counter_ns() - start) / 1e9
+
+    async def udp_rtt(self, host, sequence):
+        """Seconds until a UDP echo (or port unreachable) comes back"""
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            # Connected UDP sockets surface ICMP port unreachable as a refusal
+            sock.connect((host, self.udp_port))
+            start = time.perf_counter_ns()
+            await loop.sock_sendall(sock, UDP_PROBE.pack(sequence, start))
+            while True:
+                reply = await asyncio.wait_for(loop.sock_recv(sock, 64), self.timeout)
+                if len(reply) >= UDP_PROBE.size and UDP_PROBE.unpack_from(reply)[0] == sequence:
+                    break
+        except ConnectionRefusedError:
+            pass
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            sock.close()
+        return (time.perf_counter_ns() - start) / 1e9
+
+    async def find_port(self, host):
+        """Probe all ports at once; the first one to answer is used from then on"""
+        async def attempt(port):
+            return port, await self.tcp_rtt(host, port)
+
+        probes = [asyncio.ensure_future(attempt(port)) for port in self.ports]
+        try:
+            for finished in asyncio.as_completed(probes):
+                port, rtt = await finished
+                if rtt is not None:
+                    return port, rtt
+        finally:
+            for probe in probes:
+                probe.cancel()
+        return None, None
+
+    async def probe_host(self, host):
+        """Run count probes against one host and summarize them"""
+        loop = asyncio.get_running_loop()
+        port, first_rtt = await self.find_port(host)
+        tcp_rtts = []
+        if port is not None:
+            tcp_rtts.append(first_rtt)
+            next_start = loop.time() + self.interval
+            for _ in range(self.count - 1):
+                await asyncio.sleep(max(0.0, next_start - loop.time()))
+                next_start += self.interval
+                rtt = await self.tcp_rtt(host, port)
+                if rtt is not None:
+                    tcp_rtts.append(rtt)
+
+        result = self._stats(tcp_rtts, self.count)
+        result.update(host=host, port=port, method='tcp')
+
+        if self.udp_port is not None:
+            udp_rtts = []
+            for sequence in range(self.count):
+                rtt = await self.udp_rtt(host, sequence)
+                if rtt is not None:
+                    udp_rtts.append(rtt)
+                await asyncio.sleep(self.interval)
+            result['udp'] = self._stats(udp_rtts, self.count)
+            result['udp_port'] = self.udp_port
+        return result
+
+    async def probe_all(self, hosts):
+        """Yield per-host results as they complete, with bounded concurrency"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(host):
+            async with semaphore:
+                return await self.probe_host(host)
+
+        tasks = [asyncio.ensure_future(limited(host)) for host in hosts]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def run(self, hosts):
+        """Probe hosts and return their results in input order"""
+        async def collect():
+            return [result async for result in self.probe_all(hosts)]
+
+        order = {host: i for i, host in enumerate(hosts)}
+        return sorted(asyncio.run(collect()), key=lambda result: order[result['host']])
+
+    @staticmethod
+    def _stats(rtts, sent):
+        """min/avg/p50/p99/jitter in milliseconds plus loss percentage"""
+        received = len(rtts)
+        result = {'sent': sent, 'received': received,
+                  'loss': 100.0 * (sent - received) / sent if sent else 0.0}
+        if not rtts:
+            result.update(min=None, avg=None, p50=None, p99=None, jitter=None)
+            return result
+
+        ms = [rtt * 1000 for rtt in rtts]
+        ordered = sorted(ms)
+        # Jitter as the mean difference between consecutive replies
+        differences = [abs(b - a) for a, b in zip(ms, ms[1:])]
+        result.update(
+            min=ordered[0],
+            avg=statistics.fmean(ms),
+            p50=percentile(ordered, 0.50),
+            p99=percentile(ordered, 0.99),
+            jitter=statistics.fmean(differences) if differences else 0.0,
+        )
+        return result
+
+
+def _print_row(label, port, stats):
+    if stats['received'] == 0:
+        print(f"{label:<18}{port:>6}{'no reply':>45}{stats['loss']:>6.0f}%")
+        return
+    print(f"{label:<18}{port:>6}{stats['min']:>8.2f} {stats['avg']:>8.2f} {stats['p50']:>8.2f} "
+          f"{stats['p99']:>8.2f} {stats['jitter']:>8.2f} {stats['loss']:>5.0f}%")
+
+
+def print_results(results, show_down=False):
+    """Table of TCP results, with a UDP row under each host probed over UDP too"""
+    print(f"\n{'Host':<18}{'Port':>6}{'Min':>9}{'Avg':>9}{'P50':>9}{'P99':>9}{'Jitter':>9}{'Loss':>7}")
+    print("-" * 76)
+    for r in results:
+        udp = r.get('udp')
+        answered = r['received'] or (udp and udp['received'])
+        if not answered and not show_down:
+            continue
+        _print_row(r['host'], r['port'] if r['received'] else '-', r)
+        if udp is not None:
+            _print_row("  udp", r.get('udp_port', '-'), udp)
+    alive = sum(1 for r in results if r['received'] or (r.get('udp') and r['udp']['received']))
+    print(f"\n{alive} of {len(results)} host(s) answered (times in ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent TCP/UDP latency probe")
+    parser.add_argument('targets', nargs='+', help="hosts, addresses or CIDR blocks")
+    parser.add_argument('-c', '--count', type=int, default=4, help="probes per host")
+    parser.add_argument('-i', '--interval', type=float, default=0.2, help="seconds between probes")
+    parser.add_argument('-t', '--timeout', type=float, default=1.0, help="probe timeout in seconds")
+    parser.add_argument('-p', '--ports', default=','.join(map(str, DEFAULT_PORTS)),
+                        help="TCP ports to try, comma separated")
+    parser.add_argument('-u', '--udp-port', type=int, help="also probe this UDP echo port")
+    parser.add_argument('-a', '--all', action='store_true', help="list hosts that did not answer")
+    args = parser.parse_args()
+
+    prober = LatencyProber(count=args.count, interval=args.interval, timeout=args.timeout,
+                           ports=[int(port) for port in args.ports.split(',')],
+                           udp_port=args.udp_port)
+    print_results(prober.run(list(iter_hosts(args.targets))), show_down=args.all)
@@ -0,0 +1,163 @@
+import os
+import csv
+import json
+import html
+from datetime import datetime
+
+# (device key, column title, value when missing)
+REPORT_COLUMNS = (
+    ('ip', 'IP Address', 'N/A'),
+    ('hostname', 'Hostname', 'Unknown'),
+    ('mac', 'MAC Address', 'Unknown'),
+    ('vendor', 'Vendor', 'Unknown'),
+    ('type', 'Type', 'Unknown'),
+    ('suggested_ip', 'Suggested Static IP', ''),
+)
+
+HTML_HEAD = """<html>
+<head>
+    <title>Network Devices Report{page_title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; }}
+        table {{ border-collapse: collapse; width: 100%; }}
+        th, td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
+        th {{ background-color: #4CAF50; color: white; }}
+        tr:nth-child(even) {{ background-color: #f2f2f2; }}
+        .warning {{ color: #ff0000; font-weight: bold; }}
+    </style>
+</head>
+<body>
+    <h1>Network Devices Inventory</h1>
+    <p>Generated: {generated}</p>
+    {navigation}
+    <table>
+        <tr>{header}</tr>
+"""
+
+HTML_TAIL = """    </table>
+    {navigation}
+    <p class="warning">Note: To change IP addresses, configure DHCP reservations in your router.</p>
+    <p>Router Access: Usually http://192.168.1.1 or http://192.168.0.1</p>
+</body>
+</html>
+"""
+
+# Rows are joined and written in batches of this many
+WRITE_BATCH = 1000
+
+
+def iter_report_rows(devices, suggest_static_ip):
+    """Yield one report row (column key -> string) per device"""
+    for device in devices:
+        row = {key: str(device.get(key, missing)) for key, _, missing in REPORT_COLUMNS[:-1]}
+        row['suggested_ip'] = suggest_static_ip(device)
+        yield row
+
+
+def page_path(path, page):
+    """network_report.html, network_report_2.html, ..."""
+    if page == 1:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}_{page}{extension}"
+
+
+def _navigation(path, page, last_page):
+    if last_page == 1:
+        return ""
+    links = []
+    if page > 1:
+        links.append(f'<a href="{html.escape(os.path.basename(page_path(path, page - 1)))}">&laquo; Previous</a>')
+    links.append(f"Page {page} of {last_page}" if last_page else f"Page {page}")
+    if last_page is None or page < last_page:
+        links.append(f'<a href="{html.escape(os.path.basename(page_path(path, page + 1)))}">Next &raquo;</a>')
+    return "<p>" + " | ".join(links) + "</p>"
+
+
+def write_html_report(rows, path="network_report.html", page_size=5000, total=None):
+    """Stream rows into one or more HTML pages of page_size rows; returns the page paths
+
+    Without total the page count isn't known up front, so pages link
+    forward until the last one, which links back only.
+    """
+    if page_size < 1:
+        raise ValueError(f"page_size must be at least 1, got {page_size}")
+    generated = html.escape(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    header = "".join(f"<th>{html.escape(title)}</th>" for _, title, _ in REPORT_COLUMNS)
+    keys = [key for key, _, _ in REPORT_COLUMNS]
+    last_page = max(1, -(-total // page_size)) if total is not None else None
+    escape = html.escape
+
+    paths = []
+    rows = iter(rows)
+    page = 1
+    pending = next(rows, None)
+    while True:
+        path_for_page = page_path(path, page)
+        paths.append(path_for_page)
+        batch = []
+        written = 0
+        with open(path_for_page, 'w', encoding='utf-8') as f:
+            navigation = _navigation(path, page, last_page)
+            f.write(HTML_HEAD.format(page_title=f" (page {page})" if page > 1 else "",
+                                     generated=generated, navigation=navigation, header=header))
+            while pending is not None and written < page_size:
+                batch.append("        <tr>" + "".join(
+                    f"<td>{escape(pending[key])}</td>" for key in keys) + "</tr>\n")
+                written += 1
+                if len(batch) == WRITE_BATCH:
+                    f.write("".join(batch))
+                    batch.clear()
+                pending = next(rows, None)
+            f.write("".join(batch))
+            if pending is None and last_page is None:
+                # Now we know this is the last page: no forward link
+                navigation = _navigation(path, page, page)
+            f.write(HTML_TAIL.format(navigation=navigation))
+        if pending is None:
+            break
+        page += 1
+    return paths
+
+
+def _csv_safe(value):
+    """Keep spreadsheet apps from running hostnames like '=cmd|...' as formulas"""
+    if value and value[0] in '=+-@\t\r':
+        return "'" + value
+    return value
+
+
+def write_csv_report(rows, path="network_report.csv"):
+    """Stream rows to a CSV file; returns the number of rows written"""
+    keys = [key for key, _, _ in REPORT_COLUMNS]
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([title for _, title, _ in REPORT_COLUMNS])
+        batch = []
+        for row in rows:
+            batch.append([_csv_safe(row[key]) for key in keys])
+            if len(batch) == WRITE_BATCH:
+                writer.writerows(batch)
+                count += len(batch)
+                batch.clear()
+        writer.writerows(batch)
+        count += len(batch)
+    return count
+
+
+def write_jsonl_report(rows, path="network_report.jsonl"):
+    """Stream rows to a JSON Lines file; returns the number of rows written"""
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        batch = []
+        for row in rows:
+            batch.append(encode(row) + "\n")
+            if len(batch) == WRITE_BATCH:
+                f.write("".join(batch))
+                count += len(batch)
+                batch.clear()
+        f.write("".join(batch))
+        count += len(batch)
+    return count
@@ -0,0 +1,191 @@
+import os
+import csv
+import mmap
+import struct
+import argparse
+
+from atomic_file import write_atomic
+
+# Compiled index layout: header, then records sorted by (prefix, bits), then
+# the vendor names. Each record is the 48-bit prefix zero-padded, its length
+# in bits (24 for MA-L, 28 for MA-M, 36 for MA-S) and a name offset.
+INDEX_MAGIC = b'OUIX'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('!4sHxxII')  # Magic, version, record count, names offset
+RECORD = struct.Struct('!6sBxI')          # Prefix, prefix bits, name offset
+RECORD_KEY = 7                            # Records compare on prefix + bits
+NAME_LENGTH = struct.Struct('!H')
+PREFIX_BITS = (36, 28, 24)                # Longest first
+HEX_DIGITS = {6: 24, 7: 28, 9: 36}        # Assignment length -> prefix bits
+
+
+def normalize_mac(mac):
+    """12 lower-case hex digits, or None if mac isn't a MAC address"""
+    digits = ''.join(c for c in mac if c not in ':-. ').lower()
+    if len(digits) != 12:
+        return None
+    try:
+        int(digits, 16)
+    except ValueError:
+        return None
+    return digits
+
+
+def _prefix_key(digits, bits):
+    """Record key for the first bits of a MAC given as hex digits"""
+    value = int(digits.ljust(12, '0')[:12], 16)
+    value &= ~((1 << (48 - bits)) - 1) & 0xFFFFFFFFFFFF
+    return value.to_bytes(6, 'big') + bytes([bits])
+
+
+def parse_ieee_csv(path):
+    """(hex digits, bits, vendor) from IEEE oui.csv, mam.csv or oui36.csv"""
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or row[0] == 'Registry':
+                continue
+            digits = row[1].strip().lower()
+            bits = HEX_DIGITS.get(len(digits))
+            if bits is not None:
+                yield digits, bits, row[2].strip()
+
+
+def parse_manuf(path):
+    """(hex digits, bits, vendor) from a Wireshark manuf file ('00:00:0C/28<tab>Short<tab>Long')"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 2:
+                continue
+            prefix, _, bits = fields[0].partition('/')
+            digits = ''.join(c for c in prefix if c not in ':-.').lower()
+            bits = int(bits) if bits else len(digits) * 4
+            if bits not in PREFIX_BITS:
+                continue
+            vendor = fields[2] if len(fields) > 2 and fields[2] else fields[1]
+            yield digits[:(bits + 3) // 4], bits, vendor.strip()
+
+
+def compile_index(sources, output="oui.idx"):
+    """Build the binary index from OUI files; later sources win on duplicates"""
+    entries = {}
+    for source in sources:
+        with open(source, 'r', encoding='utf-8', errors='replace') as f:
+            is_csv = f.readline().startswith('Registry')
+        for digits, bits, vendor in (parse_ieee_csv if is_csv else parse_manuf)(source):
+            entries[_prefix_key(digits, bits)] = vendor
+
+    names = bytearray()
+    name_offsets = {}
+    records = bytearray()
+    for key in sorted(entries):
+        vendor = entries[key]
+        offset = name_offsets.get(vendor)
+        if offset is None:
+            encoded = vendor.encode('utf-8')[:0xFFFF]
+            offset = name_offsets[vendor] = len(names)
+            names += NAME_LENGTH.pack(len(encoded)) + encoded
+        records += RECORD.pack(key[:6], key[6], offset)
+
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries),
+                               INDEX_HEADER.size + len(records))
+    write_atomic(output, header + records + names)
+    return len(entries)
+
+
+class OuiIndex:
+    """Vendor lookups by binary search over a memory-mapped compiled index"""
+
+    def __init__(self, path="oui.idx"):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self._names = INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a compiled OUI index (version {INDEX_VERSION})")
+        self._cache = {}  # First 9 hex digits -> vendor; nothing longer than /36 matters
+
+    def close(self):
+        self._map.close()
+
+    def _find(self, key):
+        """Name offset of the record with this key, or None"""
+        data = self._map
+        low, high = 0, self.count
+        base = INDEX_HEADER.size
+        size = RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            start = base + middle * size
+            probe = data[start:start + RECORD_KEY]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return RECORD.unpack_from(data, start)[2]
+        return None
+
+    def _name(self, offset):
+        start = self._names + offset
+        length, = NAME_LENGTH.unpack_from(self._map, start)
+        return self._map[start + NAME_LENGTH.size:start + NAME_LENGTH.size + length].decode('utf-8')
+
+    def lookup(self, mac):
+        """Vendor for a MAC address (longest registered prefix wins), or None"""
+        digits = normalize_mac(mac) if mac else None
+        if digits is None:
+            return None
+        block = digits[:9]
+        try:
+            return self._cache[block]
+        except KeyError:
+            pass
+
+        vendor = None
+        value = int(digits, 16)
+        for bits in PREFIX_BITS:
+            masked = value & ~((1 << (48 - bits)) - 1)
+            offset = self._find(masked.to_bytes(6, 'big') + bytes([bits]))
+            if offset is not None:
+                vendor = self._name(offset)
+                break
+        if len(self._cache) >= 65536:
+            self._cache.clear()
+        self._cache[block] = vendor
+        return vendor
+
+    def annotate(self, devices):
+        """Yield devices with a missing or 'Unknown' vendor filled in from their MAC"""
+        for device in devices:
+            if device.get('vendor', 'Unknown') in ('Unknown', '', None):
+                vendor = self.lookup(device.get('mac'))
+                if vendor:
+                    if isinstance(device, dict):
+                        device['vendor'] = vendor
+                    else:
+                        device.vendor = vendor
+            yield device
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compiled OUI vendor index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('compile', help="compile IEEE CSV / Wireshark manuf files")
+    build.add_argument('sources', nargs='+', help="e.g. oui.csv mam.csv oui36.csv from standards-oui.ieee.org")
+    build.add_argument('-o', '--output', default="oui.idx")
+    find = commands.add_parser('lookup', help="look up MAC addresses")
+    find.add_argument('macs', nargs='+')
+    find.add_argument('-i', '--index', default="oui.idx")
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        count = compile_index(args.sources, args.output)
+        print(f"[+] {count} prefixes written to {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        index = OuiIndex(args.index)
+        for mac in args.macs:
+            print(f"{mac}  {index.lookup(mac) or 'Unknown'}")
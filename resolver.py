@@ -0,0 +1,207 @@
+import json
+import math
+import time
+import socket
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from atomic_file import write_atomic
+
+WAIT_SLICE = 0.05  # Seconds between checks on a lookup still queued for a worker
+
+
+class ReverseResolver:
+    """PTR lookups on a thread pool with in-flight dedupe and a TTL/LRU cache"""
+
+    def __init__(self, max_workers=32, timeout=1.0, ttl=3600, negative_ttl=300,
+                 max_entries=65536, cache_path=None):
+        self.timeout = timeout                # Seconds a lookup may run before its caller gives up
+        self.max_workers = max_workers
+        self.ttl = ttl                        # Seconds a found hostname stays cached
+        self.negative_ttl = negative_ttl      # Seconds a failed lookup stays cached
+        self.max_entries = max_entries        # Least recently used entries go first
+        self.cache_path = cache_path          # JSON file kept between runs, None for memory only
+        self.stats = {'hits': 0, 'negative_hits': 0, 'lookups': 0, 'joined': 0, 'timeouts': 0,
+                      'unstarted': 0}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ptr')
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()           # ip -> (hostname or None, expiry as time.time())
+        self._in_flight = {}                  # ip -> Future of the queued or running lookup
+        self._started = {}                    # ip -> time.monotonic() its lookup began running
+        self._queued = 0                      # Lookups submitted but not yet running
+        if cache_path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for ip, (hostname, expires) in entries.items():
+            if expires > now:
+                self._cache[ip] = (hostname, expires)
+
+    def save(self):
+        """Write unexpired entries to cache_path atomically"""
+        if not self.cache_path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = {ip: entry for ip, entry in self._cache.items() if entry[1] > now}
+        write_atomic(self.cache_path, json.dumps(entries))
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.save()
+
+    def cached(self, ip):
+        """(True, hostname or None) if ip has a live cache entry, else (False, None)"""
+        with self._lock:
+            entry = self._cache.get(ip)
+            if entry is None:
+                return False, None
+            if entry[1] <= time.time():
+                del self._cache[ip]
+                return False, None
+            self._cache.move_to_end(ip)
+            self.stats['hits' if entry[0] is not None else 'negative_hits'] += 1
+            return True, entry[0]
+
+    def _store(self, ip, hostname):
+        ttl = self.ttl if hostname is not None else self.negative_ttl
+        with self._lock:
+            self._cache[ip] = (hostname, time.time() + ttl)
+            self._cache.move_to_end(ip)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            self._in_flight.pop(ip, None)
+            self._started.pop(ip, None)
+
+    def _lookup(self, ip):
+        with self._lock:
+            self._started[ip] = time.monotonic()
+            self._queued -= 1
+        try:
+            hostname = socket.gethostbyaddr(ip)[0]
+        except (OSError, UnicodeError):
+            hostname = None
+        self._store(ip, hostname)
+        return hostname
+
+    def submit(self, ip):
+        """Future for ip's hostname (None if it has none), shared with any lookup already running"""
+        hit, hostname = self.cached(ip)
+        if hit:
+            future = Future()
+            future.set_result(hostname)
+            return future
+        with self._lock:
+            future = self._in_flight.get(ip)
+            if future is not None:
+                self.stats['joined'] += 1
+                return future
+            self.stats['lookups'] += 1
+            self._queued += 1
+            future = self._in_flight[ip] = self._pool.submit(self._lookup, ip)
+            return future
+
+    def _limit(self, lookups=1):
+        """Latest time.monotonic() worth waiting for lookups queued behind the others"""
+        with self._lock:
+            queued = max(self._queued, lookups)
+        return time.monotonic() + math.ceil(queued / self.max_workers) * self.timeout + self.timeout
+
+    def _wait_time(self, ip, limit):
+        """Seconds to wait before checking ip's lookup again, or None to give up
+
+        The timeout counts from when the lookup started running, so lookups
+        queued behind max_workers others aren't charged for the wait.
+        """
+        now = time.monotonic()
+        with self._lock:
+            started = self._started.get(ip)
+        if started is None:
+            deadline = min(limit, now + WAIT_SLICE)
+        else:
+            deadline = min(limit, started + self.timeout)
+        if deadline <= now and (started is not None or now >= limit):
+            return None
+        return max(0.0, deadline - now)
+
+    def _give_up(self, ip):
+        # The lookup keeps going and fills the cache when it finishes;
+        # one that never started was never tried, so it isn't a timeout
+        with self._lock:
+            started = ip in self._started
+        self.stats['timeouts' if started else 'unstarted'] += 1
+        return None
+
+    def _result(self, ip, future, limit):
+        while True:
+            wait = self._wait_time(ip, limit)
+            if wait is None:
+                if future.done():
+                    return future.result()
+                return self._give_up(ip)
+            try:
+                return future.result(wait)
+            except FutureTimeout:
+                continue
+
+    def resolve(self, ip):
+        """Hostname for ip, or None if it has none or the lookup outlasts the timeout"""
+        return self._result(ip, self.submit(ip), self._limit())
+
+    def resolve_many(self, ips):
+        """{ip: hostname or None} for many addresses, looked up concurrently"""
+        futures = {ip: self.submit(ip) for ip in ips}
+        limit = self._limit(len(futures))
+        return {ip: self._result(ip, future, limit) for ip, future in futures.items()}
+
+    async def aresolve(self, ip):
+        """resolve() for asyncio code"""
+        hit, hostname = self.cached(ip)
+        if hit:
+            return hostname
+        future = asyncio.wrap_future(self.submit(ip))
+        limit = self._limit()
+        while True:
+            wait = self._wait_time(ip, limit)
+            if wait is None:
+                if future.done():
+                    return future.result()
+                return self._give_up(ip)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), wait)
+            except asyncio.TimeoutError:
+                continue
+
+
+def fill_hostnames(devices, resolver, batch_size=256):
+    """Yield devices with 'Unknown' hostnames looked up, resolving a batch at a time"""
+    batch = []
+    for device in devices:
+        batch.append(device)
+        if len(batch) == batch_size:
+            yield from _fill_batch(batch, resolver)
+            batch = []
+    yield from _fill_batch(batch, resolver)
+
+
+def _fill_batch(batch, resolver):
+    unknown = [device for device in batch
+               if device.get('hostname', 'Unknown') in ('Unknown', '', None) and device.get('ip')]
+    if unknown:
+        names = resolver.resolve_many({device.get('ip') for device in unknown})
+        for device in unknown:
+            hostname = names.get(device.get('ip'))
+            if hostname:
+                if isinstance(device, dict):
+                    device['hostname'] = hostname
+                else:
+                    device.hostname = hostname
+    return batch
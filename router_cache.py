@@ -0,0 +1,118 @@
+import json
+import time
+import hashlib
+import threading
+
+from atomic_file import write_atomic
+
+
+def response_fingerprint(response):
+    """Identify the router software behind a response from its headers"""
+    server = response.headers.get('Server', '')
+    realm = response.headers.get('WWW-Authenticate', '')
+    return hashlib.sha1(f"{server}|{realm}".encode('utf-8')).hexdigest()[:16]
+
+
+def credential_hash(router_ip, username, password):
+    """Salted, slow hash of a password, so cached sessions are tied to it without storing it"""
+    salt = f"{username}@{router_ip}".encode('utf-8')
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 20000).hex()[:32]
+
+
+class RouterCache:
+    """On-disk cache of discovered router endpoints, login forms and session cookies"""
+
+    def __init__(self, path="router_cache.json", ttl=7 * 24 * 3600, session_ttl=10 * 60,
+                 save_interval=5.0):
+        self.path = path
+        self.ttl = ttl                      # Seconds discovered endpoints stay valid
+        self.session_ttl = session_ttl      # Seconds saved session cookies stay valid
+        self.save_interval = save_interval  # Changes reach the file at most this often; see flush()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = None               # time.monotonic() of the last write
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def save(self):
+        """Write the cache atomically, readable by the current user only"""
+        # Written under the lock so a slower writer can't replace a newer snapshot
+        with self._lock:
+            write_atomic(self.path, json.dumps(self.entries, indent=2))
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+    def flush(self):
+        """Write changes that are still waiting for save_interval to pass"""
+        if self._dirty:
+            self.save()
+
+    def _changed(self):
+        """Note a change, saving now only if the last save is save_interval old"""
+        with self._lock:
+            self._dirty = True
+            due = self._saved_at is None or time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    @staticmethod
+    def _key(router_ip, username):
+        return f"{username}@{router_ip}"
+
+    def get(self, router_ip, username):
+        """Return the live part of a router's entry, evicting what has expired"""
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(self._key(router_ip, username))
+            if entry is None:
+                return None
+            if now - entry.get('updated', 0) > self.ttl:
+                del self.entries[self._key(router_ip, username)]
+                return None
+            if 'cookies' in entry and now - entry.get('session_updated', 0) > self.session_ttl:
+                del entry['cookies']
+            return dict(entry)
+
+    def put(self, router_ip, username, **fields):
+        """Merge fields into a router's entry"""
+        now = time.time()
+        with self._lock:
+            entry = self.entries.setdefault(self._key(router_ip, username), {})
+            entry.update(fields)
+            entry['updated'] = now
+            if 'cookies' in fields:
+                entry['session_updated'] = now
+        self._changed()
+
+    def invalidate(self, router_ip, username, *fields):
+        """Drop the named fields of an entry, or the whole entry if none are named"""
+        key = self._key(router_ip, username)
+        with self._lock:
+            if key not in self.entries:
+                return
+            if fields:
+                for field in fields:
+                    self.entries[key].pop(field, None)
+            else:
+                del self.entries[key]
+        self._changed()
+
+    def check_fingerprint(self, router_ip, username, response):
+        """Record the router's fingerprint; drop the entry if a different router answers"""
+        fingerprint = response_fingerprint(response)
+        entry = self.get(router_ip, username)
+        if entry is None:
+            return True
+        if entry.get('fingerprint') not in (None, fingerprint):
+            self.invalidate(router_ip, username)
+            return False
+        if entry.get('fingerprint') is None:
+            self.put(router_ip, username, fingerprint=fingerprint)
+        return True
@@ -0,0 +1,215 @@
+import time
+import random
+import hashlib
+import secrets
+import threading
+import argparse
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# The candidate URLs RouterController probes, in its own order
+LOGIN_PATHS = ('/login.cgi', '/admin/login.asp', '/', '/login.html')
+DEVICE_PATHS = ('/dhcpclients.htm', '/connected_devices.asp', '/lan_dhcp.html', '/cgi-bin/lanDHCP.cgi')
+
+LOGIN_PAGE = (
+    "<html><head><title>Router Login</title></head><body>"
+    "<form method=\"post\" action=\"/dologin\">"
+    "<input name=\"username\" type=\"text\"><input name=\"password\" type=\"password\">"
+    "<input name=\"csrf\" type=\"hidden\" value=\"emulated\">"
+    "<input type=\"submit\" value=\"Login\"></form></body></html>"
+).encode('utf-8')
+
+
+def synthetic_dhcp_page(rows):
+    """A router-style DHCP client page: layout tables around one big lease table"""
+    parts = [
+        "<html><head><title>DHCP Clients</title></head><body>",
+        "<table><tr><td><a href='/'>Home</a></td><td><a href='/lan'>LAN</a></td></tr></table>",
+        "<table border=1><tr><th>Host Name</th><th>MAC Address</th><th>IP Address</th>"
+        "<th>Lease Time</th></tr>",
+    ]
+    for i in range(rows):
+        parts.append(
+            f"<tr><td>device-{i}</td><td>02:00:{i >> 24 & 255:02x}:{i >> 16 & 255:02x}:"
+            f"{i >> 8 & 255:02x}:{i & 255:02x}</td><td>10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}</td>"
+            f"<td>23:59:{i % 60:02d}</td></tr>"
+        )
+    parts.append("</table></body></html>")
+    return ''.join(parts)
+
+
+class RouterEmulator:
+    """Local HTTP stand-in for a router admin panel, for exercising RouterController"""
+
+    def __init__(self, port=0, host='127.0.0.1', devices=50, latency=0.0, jitter=0.0,
+                 error_rate=0.0, login_path='/login.html', devices_path='/cgi-bin/lanDHCP.cgi',
+                 username='admin', password='admin', etag=True, seed=None):
+        self.host = host
+        self.port = port                  # 0 picks a free port
+        self.latency = latency            # Seconds added to every response
+        self.jitter = jitter              # Up to this many extra seconds, uniformly random
+        self.error_rate = error_rate      # Fraction of requests answered with a 500
+        self.login_path = login_path
+        self.devices_path = devices_path
+        self.username = username
+        self.password = password
+        self.etag = etag                  # Send ETags and honour If-None-Match
+        self.random = random.Random(seed)
+        self.sessions = set()
+        self.counters = {'requests': 0, 'logins': 0, 'device_pages': 0, 'not_modified': 0,
+                         'errors': 0, 'not_found': 0, 'unauthorized': 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self.set_devices(devices)
+
+    @property
+    def address(self):
+        """host:port, as passed to RouterController for router_ip"""
+        return f"{self.host}:{self.port}"
+
+    def set_devices(self, count):
+        """Change the device table size; the page and its ETag change with it"""
+        page = synthetic_dhcp_page(count).encode('utf-8')
+        with self._lock:
+            self.device_count = count
+            self.device_page = page
+            self.device_etag = '"' + hashlib.sha1(page).hexdigest()[:16] + '"'
+
+    def start(self):
+        """Serve in a background thread and return the bound address"""
+        handler = type('Handler', (EmulatorHandler,), {'emulator': self})
+        self._server = EmulatorServer((self.host, self.port), handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.address
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def delay(self):
+        with self._lock:
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate and self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+
+class EmulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # The default of 5 drops SYNs under concurrent probing
+
+    def handle_error(self, request, client_address):
+        # RouterController drops the connections of probes it no longer needs
+        pass
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like a real router's web server
+    server_version = 'RouterEmulator/1.0'
+    emulator = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _session(self):
+        cookie = self.headers.get('Cookie') or ''
+        for part in cookie.split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'SID' and value in self.emulator.sessions:
+                return value
+        return None
+
+    def do_GET(self):
+        emulator = self.emulator
+        emulator.count('requests')
+        if emulator.delay():
+            emulator.count('errors')
+            self._reply(500, b'<html>Internal Server Error</html>')
+            return
+
+        path = self.path.split('?', 1)[0]
+        if path == emulator.login_path:
+            self._reply(200, LOGIN_PAGE)
+        elif path == emulator.devices_path:
+            if self._session() is None:
+                # Routers tend to answer an expired session with the login page
+                emulator.count('unauthorized')
+                self._reply(200, LOGIN_PAGE)
+                return
+            with emulator._lock:
+                page, etag = emulator.device_page, emulator.device_etag
+            if emulator.etag and self.headers.get('If-None-Match') == etag:
+                emulator.count('not_modified')
+                self._reply(304, headers=[('ETag', etag)])
+                return
+            emulator.count('device_pages')
+            self._reply(200, page, [('ETag', etag)] if emulator.etag else ())
+        else:
+            emulator.count('not_found')
+            self._reply(404, b'<html>Not Found</html>')
+
+    def do_POST(self):
+        emulator = self.emulator
+        emulator.count('requests')
+        length = int(self.headers.get('Content-Length') or 0)
+        form = self.rfile.read(length).decode('utf-8', errors='replace')
+        if emulator.delay():
+            emulator.count('errors')
+            self._reply(500, b'<html>Internal Server Error</html>')
+            return
+
+        fields = parse_qs(form)
+        if (self.path.split('?', 1)[0] != '/dologin'
+                or fields.get('username') != [emulator.username]
+                or fields.get('password') != [emulator.password]):
+            self._reply(200, LOGIN_PAGE)  # Wrong credentials: the form again
+            return
+        session = secrets.token_hex(8)
+        emulator.sessions.add(session)
+        emulator.count('logins')
+        self._reply(200, b'<html>Welcome</html>', [('Set-Cookie', f'SID={session}; Path=/')])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local router admin panel emulator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--devices', type=int, default=50, help="rows in the device table")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds, up to this")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument('--login-path', default='/login.html', choices=LOGIN_PATHS)
+    parser.add_argument('--devices-path', default='/cgi-bin/lanDHCP.cgi', choices=DEVICE_PATHS)
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--no-etag', action='store_true')
+    args = parser.parse_args()
+
+    emulator = RouterEmulator(port=args.port, host=args.host, devices=args.devices,
+                              latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              login_path=args.login_path, devices_path=args.devices_path,
+                              password=args.password, etag=not args.no_etag)
+    print(f"[+] Router emulator on http://{emulator.start()} (admin/{args.password}), Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n[+] {emulator.counters}")
+        emulator.stop()
@@ -0,0 +1,174 @@
+import re
+from html.parser import HTMLParser
+
+IP_PATTERN = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
+MAC_PATTERN = re.compile(r'^[0-9A-Fa-f]{2}(?:[:-][0-9A-Fa-f]{2}){5}$')
+
+# Prefixes of header words that identify a device column, so "Hostname",
+# "IPv4" and "Clients" match too; checked in this order because "MAC Address"
+# would otherwise look like an IP address column
+COLUMN_KEYWORDS = (
+    ('mac', ('mac', 'hardware', 'physical')),
+    ('ip', ('ip', 'address')),
+    ('hostname', ('host', 'name', 'device', 'client')),
+)
+
+
+def detect_columns(header_cells):
+    """Map device fields to column positions from a table's header row"""
+    columns = {}
+    for position, text in enumerate(header_cells):
+        words = re.findall(r'[a-z0-9]+', text.lower())
+        for field, keywords in COLUMN_KEYWORDS:
+            if field not in columns and any(word.startswith(keywords) for word in words):
+                columns[field] = position
+                break
+    return columns if ('ip' in columns or 'mac' in columns) else None
+
+
+def detect_columns_from_values(cells):
+    """Guess the ip/mac columns of a headerless table from a data row"""
+    columns = {}
+    for position, text in enumerate(cells):
+        if 'ip' not in columns and IP_PATTERN.match(text):
+            columns['ip'] = position
+        elif 'mac' not in columns and MAC_PATTERN.match(text):
+            columns['mac'] = position
+    if 'ip' in columns and 'mac' in columns:
+        others = [p for p in range(len(cells)) if p not in columns.values() and cells[p]]
+        if others:
+            columns['hostname'] = others[0]
+        return columns
+    return None
+
+
+class DeviceTableParser(HTMLParser):
+    """Collect table rows as lists of cell text without building a document tree"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []        # Finished (table id, is header, cells) tuples
+        self._tables = []     # Stack of open tables: [table id, row cells, cell parts, row is header]
+        self._next_table = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self._tables.append([self._next_table, None, None, False])
+            self._next_table += 1
+        elif not self._tables:
+            return
+        elif tag == 'tr':
+            self._end_row()
+            self._tables[-1][1] = []
+            self._tables[-1][3] = False
+        elif tag in ('td', 'th'):
+            table = self._tables[-1]
+            self._end_cell()
+            if table[1] is None:
+                table[1] = []  # Cell without an explicit <tr>
+            table[2] = []
+            if tag == 'th':
+                table[3] = True
+
+    def handle_endtag(self, tag):
+        if not self._tables:
+            return
+        if tag == 'table':
+            self._end_row()
+            self._tables.pop()
+        elif tag == 'tr':
+            self._end_row()
+        elif tag in ('td', 'th'):
+            self._end_cell()
+
+    def handle_data(self, data):
+        if self._tables:
+            parts = self._tables[-1][2]
+            if parts is not None:
+                parts.append(data)
+
+    def _end_cell(self):
+        table = self._tables[-1]
+        if table[2] is not None:
+            table[1].append(''.join(table[2]).strip())
+            table[2] = None
+
+    def _end_row(self):
+        self._end_cell()
+        table = self._tables[-1]
+        if table[1]:
+            self.rows.append((table[0], table[3], table[1]))
+        table[1] = None
+
+
+def iter_table_rows(html, chunk_size=64 * 1024):
+    """Yield (table id, is header, cells) while feeding the page in chunks
+
+    html may be a string or an iterable of string chunks, such as
+    response.iter_content(decode_unicode=True).
+    """
+    parser = DeviceTableParser()
+    if isinstance(html, str):
+        page = html
+        chunks = (page[i:i + chunk_size] for i in range(0, len(page), chunk_size))
+    else:
+        chunks = html
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.rows:
+            yield from parser.rows
+            parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+
+
+def iter_device_rows(html, chunk_size=64 * 1024, tables=None):
+    """Yield a device dict for every row of every device-looking table
+
+    tables, if given, is filled with the column mapping found for each
+    table id (None for tables that never looked like a device list).
+    """
+    if tables is None:
+        tables = {}  # table id -> column mapping, None while it is unknown
+    for table_id, is_header, cells in iter_table_rows(html, chunk_size):
+        if table_id not in tables:
+            # A header row that names the columns settles the mapping. Any
+            # other first row is skipped as a header unless it holds data.
+            columns = detect_columns(cells)
+            tables[table_id] = columns
+            if columns or is_header or detect_columns_from_values(cells) is None:
+                continue
+
+        columns = tables[table_id]
+        if columns is None:
+            columns = detect_columns_from_values(cells)
+            if columns is not None:
+                tables[table_id] = columns
+            elif len(cells) >= 3:
+                # The ip, mac, hostname order most router pages use
+                columns = {'ip': 0, 'mac': 1, 'hostname': 2}
+            else:
+                continue
+
+        device = {}
+        for field in ('ip', 'mac', 'hostname'):
+            position = columns.get(field)
+            value = cells[position] if position is not None and position < len(cells) else ''
+            device[field] = value or 'Unknown'
+        if device['ip'] == 'Unknown' and device['mac'] == 'Unknown':
+            continue
+        device['status'] = 'Connected'
+        yield device
+
+
+def parse_device_table(html, chunk_size=64 * 1024):
+    """Devices listed on a page, [] for an empty device table or None if it has none
+
+    A login form or error page has no device table, so None tells a failed
+    fetch apart from a router with nothing connected.
+    """
+    tables = {}
+    devices = list(iter_device_rows(html, chunk_size, tables))
+    if devices or any(columns is not None for columns in tables.values()):
+        return devices
+    return None
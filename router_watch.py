@@ -0,0 +1,90 @@
+import time
+
+from device_inventory import device_key
+
+
+def index_devices(devices):
+    return {device_key(device): device for device in devices}
+
+
+def diff_devices(previous, current):
+    """Yield join, leave and ip_change events between two MAC-indexed snapshots"""
+    for key, device in current.items():
+        old = previous.get(key)
+        if old is None:
+            yield {'event': 'join', 'mac': device['mac'], 'ip': device['ip'],
+                   'hostname': device['hostname']}
+        elif old['ip'] != device['ip']:
+            yield {'event': 'ip_change', 'mac': device['mac'], 'ip': device['ip'],
+                   'old_ip': old['ip'], 'hostname': device['hostname']}
+    for key, device in previous.items():
+        if key not in current:
+            yield {'event': 'leave', 'mac': device['mac'], 'ip': device['ip'],
+                   'hostname': device['hostname']}
+
+
+class DeviceWatcher:
+    """Poll a RouterController and report only the devices that joined, left or moved"""
+
+    def __init__(self, controller, interval=60, leave_after=1):
+        self.controller = controller
+        self.interval = interval        # Seconds between polls
+        self.leave_after = leave_after  # Polls a device must be missing before it has left
+        self.snapshot = {}              # Device key -> device, as last reported
+        self.state = {}                 # Endpoint, validators and body hash between polls
+        self.stats = {'polls': 0, 'not_modified': 0, 'unchanged': 0, 'parsed': 0, 'failed': 0}
+        self._missing = {}              # Device key -> consecutive polls without it
+
+    def poll(self):
+        """Poll once and return the list of events, empty when nothing changed"""
+        self.stats['polls'] += 1
+        devices = self.controller.poll_devices(self.state)
+        status = self.state.get('status', 'unchanged')
+        self.stats[status] += 1
+        if status == 'failed':
+            # A failed poll says nothing about the devices; keep the snapshot
+            return []
+        if devices is None:
+            return self._expire_missing()
+
+        current = index_devices(devices)
+        for key in current:
+            self._missing.pop(key, None)
+        now = time.time()
+        events = []
+        for event in diff_devices(self.snapshot, current):
+            if event['event'] == 'leave':
+                # Reported by _expire_missing once it has been gone long enough
+                key = device_key(event)
+                self._missing.setdefault(key, 0)
+                current[key] = self.snapshot[key]
+                continue
+            event['time'] = now
+            events.append(event)
+        self.snapshot = current
+        return events + self._expire_missing()
+
+    def _expire_missing(self):
+        """Count another poll without each missing device and report those now gone"""
+        now = time.time()
+        events = []
+        for key in list(self._missing):
+            self._missing[key] += 1
+            if self._missing[key] >= self.leave_after:
+                del self._missing[key]
+                device = self.snapshot.pop(key)
+                events.append({'event': 'leave', 'mac': device['mac'], 'ip': device['ip'],
+                               'hostname': device['hostname'], 'time': now})
+        return events
+
+    def watch(self, polls=None):
+        """Yield events as they happen, polling every interval seconds"""
+        next_poll = time.monotonic()
+        count = 0
+        while polls is None or count < polls:
+            yield from self.poll()
+            count += 1
+            if polls is not None and count >= polls:
+                break
+            next_poll += self.interval
+            time.sleep(max(0.0, next_poll - time.monotonic()))
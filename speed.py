@@ -3,94 +3,1308 @@ import time
 import threading
 import struct
 import sys
+import os
+import json
+import mmap
+import tempfile
+import asyncio
+import gc
+import math
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from latency import percentile
+
+# Every connection opens with a header: magic, connection kind, session id
+# and stream index. One control connection per session carries framed JSON
+# messages; the data connections carry nothing but payload.
+CONN_HEADER = struct.Struct('!4sB16sH')
+FRAME_HEADER = struct.Struct('!I')
+PROTOCOL_MAGIC = b'NSPD'
+CONN_CONTROL = 0
+CONN_DATA = 1
+
+MODES = ('upload', 'reverse', 'bidir')
+PROTOCOLS = ('tcp', 'udp')
+MAX_STREAMS = 128
+MAX_FRAME_SIZE = 8 * 1024 * 1024
+MIN_INTERVAL = 0.01
+
+# UDP test datagrams start with a sequence number and the sender's
+# perf_counter_ns timestamp; the rest is padding up to the packet size
+UDP_HEADER = struct.Struct('!QQ')
+UDP_MAX_PACKET = 65507
+UDP_RCVBUF = 8 * 1024 * 1024
+MAX_PACING_DEBT_NS = 50_000_000  # Catch up at most 50 ms of missed sends
+REORDER_WINDOW = 4096            # Sequence numbers tracked behind the highest one seen
+MAX_UDP_RATE_MBPS = 100_000      # Ceiling assumed for tests sent as fast as possible
+
+
+def recv_exact(sock, size):
+    """Read exactly size bytes from a socket"""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message")
+        data += chunk
+    return bytes(data)
+
+
+def send_frame(sock, message):
+    """Send one length-prefixed JSON control message"""
+    body = json.dumps(message).encode('utf-8')
+    sock.sendall(FRAME_HEADER.pack(len(body)) + body)
+
+
+def recv_frame(sock):
+    """Receive one length-prefixed JSON control message"""
+    (size,) = FRAME_HEADER.unpack(recv_exact(sock, FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Control frame too large ({size} bytes)")
+    return json.loads(recv_exact(sock, size).decode('utf-8'))
+
+
+def check_hello(hello, max_streams=MAX_STREAMS, max_target_size=None, max_duration=None):
+    """Return an error message if a client's hello is not acceptable"""
+    mode = hello.get('mode')
+    streams = hello.get('streams')
+    target_size = hello.get('target_size')
+    duration = hello.get('duration')
+    interval = hello.get('interval', 0.1)
+    
+    protocol = hello.get('protocol', 'tcp')
+    
+    if hello.get('type') != 'hello':
+        return "Expected hello"
+    if mode not in MODES:
+        return f"Unsupported mode: {mode}"
+    if protocol not in PROTOCOLS:
+        return f"Unsupported protocol: {protocol}"
+    if protocol == 'udp':
+        packet_size = hello.get('packet_size')
+        rate_mbps = hello.get('rate_mbps')
+        if mode != 'upload':
+            return "UDP tests run client to server only"
+        if not isinstance(packet_size, int) or not UDP_HEADER.size <= packet_size <= UDP_MAX_PACKET:
+            return f"UDP packet size must be {UDP_HEADER.size}-{UDP_MAX_PACKET} bytes"
+        if not isinstance(rate_mbps, (int, float)) or rate_mbps < 0:
+            return "Invalid UDP rate"
+    if not isinstance(streams, int) or not 1 <= streams <= max_streams:
+        return f"Stream count must be 1-{max_streams}"
+    if duration is None:
+        if not isinstance(target_size, int) or target_size <= 0:
+            return "Invalid target size"
+        if max_target_size and target_size > max_target_size:
+            return f"Target size is limited to {max_target_size} bytes per stream"
+    else:
+        if not isinstance(duration, (int, float)) or duration <= 0:
+            return "Invalid duration"
+        if max_duration and duration > max_duration:
+            return f"Duration is limited to {max_duration} seconds"
+    if not isinstance(interval, (int, float)) or interval < MIN_INTERVAL:
+        return f"Sampling interval must be at least {MIN_INTERVAL} seconds"
+    return None
+
+
+def udp_packet_limit(hello):
+    """Most datagrams a UDP test can legitimately send"""
+    packet_size = hello['packet_size']
+    if hello.get('duration') is None:
+        return math.ceil(hello['target_size'] / packet_size)
+    # Pacing can run a little ahead after catching up, so allow some slack
+    rate_mbps = hello.get('rate_mbps') or MAX_UDP_RATE_MBPS
+    expected = hello['duration'] * rate_mbps * 1e6 / (8 * packet_size)
+    return math.ceil(expected * 1.1) + REORDER_WINDOW
+
+
+def mode_directions(mode):
+    """Return (client sends, client receives) for a test mode"""
+    return mode in ('upload', 'bidir'), mode in ('reverse', 'bidir')
+
+
+def summarize_samples(samples):
+    """min/median/p95/max of the interval rates, leaving out warm-up samples"""
+    rates = sorted(sample['mbps'] for sample in samples if not sample['warmup'])
+    if not rates:
+        return None
+    return {
+        'samples': len(rates),
+        'min': rates[0],
+        'median': statistics.median(rates),
+        'p95': percentile(rates, 0.95),
+        'max': rates[-1],
+        'mean': statistics.fmean(rates),
+    }
+
+
+class IntervalSampler:
+    """Record per-interval throughput of live stream results on a background thread"""
+    
+    def __init__(self, directions, interval=0.1, warmup=0.0, output=None, source='local'):
+        self.directions = directions    # name -> list of stream result dicts
+        self.interval_ns = int(interval * 1e9)
+        self.warmup_ns = int(warmup * 1e9)
+        self.output = output            # File object that receives JSONL samples
+        self.source = source
+        self.samples = {name: [] for name in directions}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self.start_ns = self._last_ns = time.perf_counter_ns()
+        self._last_bytes = {name: 0 for name in self.directions}
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop sampling, record the final partial interval and return summaries"""
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            self._take(time.perf_counter_ns(), final=True)
+        return {name: summarize_samples(samples) for name, samples in self.samples.items()}
+    
+    def _run(self):
+        # Ticks stay aligned to the start time so one late wake-up does not
+        # shift every following sample
+        next_tick = self.start_ns + self.interval_ns
+        while not self._stop.wait(max(0, next_tick - time.perf_counter_ns()) / 1e9):
+            self._take(time.perf_counter_ns())
+            next_tick += self.interval_ns
+    
+    def _take(self, now_ns, final=False):
+        elapsed_ns = now_ns - self._last_ns
+        if elapsed_ns <= 0 or (final and elapsed_ns < self.interval_ns // 10):
+            return
+        for name, streams in self.directions.items():
+            total = sum(stream.get('bytes', 0) for stream in streams)
+            delta = total - self._last_bytes[name]
+            self._last_bytes[name] = total
+            sample = {
+                't': (now_ns - self.start_ns) / 1e9,
+                'bytes': delta,
+                'mbps': delta * 8 * 1000 / elapsed_ns,
+                'warmup': self._last_ns - self.start_ns < self.warmup_ns,
+            }
+            self.samples[name].append(sample)
+            if self.output is not None:
+                write_jsonl(self.output, dict(type='sample', source=self.source,
+                                              direction=name, **sample))
+        self._last_ns = now_ns
+
+
+class UdpReceiver:
+    """Receive UDP test datagrams and track loss, reordering and RFC 3550 jitter"""
+    
+    def __init__(self, sock, max_packets):
+        self.sock = sock
+        self.max_packets = max_packets  # Sequences at or above this are dropped
+        self.packets = 0
+        self.bytes = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.late = 0       # Arrived too far behind the newest packet to check for duplicates
+        self.jitter_ns = 0.0
+        self.first_ns = None
+        self.last_ns = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        sock = self.sock
+        sock.settimeout(0.05)
+        # One buffer large enough for any datagram, reused for every read;
+        # the per-packet work below sticks to locals
+        buffer = bytearray(UDP_MAX_PACKET + 1)
+        view = memoryview(buffer)
+        unpack_from = UDP_HEADER.unpack_from
+        header_size = UDP_HEADER.size
+        clock = time.perf_counter_ns
+        # Ring of seen flags for the REORDER_WINDOW sequences ending at
+        # max_sequence; its size stays fixed whatever sequence numbers arrive
+        window = REORDER_WINDOW
+        seen = bytearray(window)
+        zeros = memoryview(bytes(window))
+        max_packets = self.max_packets
+        max_sequence = -1
+        last_transit = None
+        jitter = 0.0
+        packets = total_bytes = duplicates = reordered = late = 0
+        
+        while not self._stop.is_set():
+            try:
+                size = sock.recv_into(view)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            now = clock()
+            if size < header_size:
+                continue
+            sequence, sent_ns = unpack_from(buffer)
+            if sequence >= max_packets:
+                continue
+            if sequence > max_sequence:
+                # Slide the window forward, clearing the slots it now covers
+                advance = sequence - max_sequence
+                if advance >= window:
+                    seen[:] = zeros
+                else:
+                    first = (max_sequence + 1) % window
+                    end = first + advance
+                    if end <= window:
+                        seen[first:end] = zeros[:advance]
+                    else:
+                        seen[first:] = zeros[:window - first]
+                        seen[:end - window] = zeros[:end - window]
+                max_sequence = sequence
+            elif max_sequence - sequence >= window:
+                late += 1
+                continue
+            elif seen[sequence % window]:
+                duplicates += 1
+                continue
+            else:
+                reordered += 1
+            seen[sequence % window] = 1
+            
+            packets += 1
+            total_bytes += size
+            
+            # RFC 3550 6.4.1: the clock offset between hosts cancels out
+            # in the difference of consecutive transit times
+            transit = now - sent_ns
+            if last_transit is not None:
+                difference = transit - last_transit
+                if difference < 0:
+                    difference = -difference
+                jitter += (difference - jitter) / 16
+            last_transit = transit
+            
+            if self.first_ns is None:
+                self.first_ns = now
+            self.last_ns = now
+            self.packets = packets
+            self.bytes = total_bytes
+        
+        self.jitter_ns = jitter
+        self.duplicates = duplicates
+        self.reordered = reordered
+        self.late = late
+    
+    def stop(self, packets_sent, drain=1.0, quiet=0.1):
+        """Let in-flight datagrams land, stop reading and return the statistics"""
+        deadline = time.perf_counter_ns() + int(drain * 1e9)
+        quiet_ns = int(quiet * 1e9)
+        while time.perf_counter_ns() < deadline:
+            last = self.last_ns
+            if last is not None and time.perf_counter_ns() - last >= quiet_ns:
+                break
+            time.sleep(0.02)
+        self._stop.set()
+        self._thread.join()
+        
+        duration = ((self.last_ns - self.first_ns) / 1e9) if self.packets > 1 else 0.0
+        lost = max(packets_sent - self.packets, 0)
+        return {
+            'packets_sent': packets_sent,
+            'packets_received': self.packets,
+            'lost': lost,
+            'loss_pct': 100.0 * lost / packets_sent if packets_sent else 0.0,
+            'reordered': self.reordered,
+            'duplicates': self.duplicates,
+            'late': self.late,
+            'jitter_ms': self.jitter_ns / 1e6,
+            'bytes': self.bytes,
+            'duration': duration,
+            'mbps': self.bytes * 8 / (duration * 1_000_000) if duration > 0 else 0.0,
+            'pps': self.packets / duration if duration > 0 else 0.0,
+        }
+    
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.sock.close()
+
+
+def tune_socket(sock, sndbuf=None, rcvbuf=None):
+    """Apply socket buffer sizes; None keeps the OS default"""
+    if sndbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+
+
+def open_payload(chunk_size):
+    """(file, read-only mmap) holding one chunk of test data, shared by every send loop"""
+    payload_file = tempfile.TemporaryFile()
+    payload_file.write(b'X' * chunk_size)
+    payload_file.flush()
+    payload = mmap.mmap(payload_file.fileno(), chunk_size, access=mmap.ACCESS_READ)
+    return payload_file, payload
+
+
+def open_udp_receiver(host, port, max_packets, rcvbuf=None):
+    """Bind a UDP test socket with a large receive buffer and start reading"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf or UDP_RCVBUF)
+    sock.bind((host, port))
+    return UdpReceiver(sock, max_packets).start()
+
+
+def write_jsonl(output, record):
+    output.write(json.dumps(record) + '\n')
+    output.flush()
+
+
+def build_result(session, intervals, cpu_seconds=None):
+    """Build the result message a server reports back to the client"""
+    result = {'type': 'result', 'mode': session['mode']}
+    for direction in ('received', 'sent'):
+        streams = session[direction]
+        if streams is not None:
+            result[direction] = {
+                'streams': streams,
+                'total': LocalNetworkSpeedTest._summarize(streams, cpu_seconds),
+                'intervals': intervals.get(direction)
+            }
+    if session['want_samples']:
+        # Compact [t, bytes, mbps, warmup] rows keep long tests inside one frame
+        result['samples'] = {
+            direction: [[s['t'], s['bytes'], s['mbps'], s['warmup']] for s in samples]
+            for direction, samples in session['sampler'].samples.items()
+        }
+    return result
+
 
 class LocalNetworkSpeedTest:
-    def __init__(self, port=5555):
+    def __init__(self, port=5555, streams=1, target_size=10 * 1024 * 1024,
+                 chunk_size=128 * 1024, sndbuf=None, rcvbuf=None, use_sendfile=False,
+                 mode='upload', duration=None, interval=0.1, warmup=0.0, jsonl=None,
+                 protocol='tcp', rate_mbps=100, packet_size=1400):
         self.port = port
+        self.streams = streams
+        self.target_size = target_size  # Bytes per stream and direction
+        self.chunk_size = chunk_size    # Bytes per send/recv call
+        self.sndbuf = sndbuf            # SO_SNDBUF, None keeps the OS default
+        self.rcvbuf = rcvbuf            # SO_RCVBUF, None keeps the OS default
+        self.use_sendfile = use_sendfile and hasattr(os, 'sendfile')
+        self.mode = mode                # upload, reverse (server->client) or bidir
+        self.duration = duration        # Seconds per test; overrides target_size
+        self.interval = interval        # Seconds between throughput samples
+        self.warmup = warmup            # Seconds of samples left out of summaries
+        self.jsonl = jsonl              # Path for JSONL samples, '-' for stdout
+        self.protocol = protocol        # tcp or udp
+        self.rate_mbps = rate_mbps      # UDP target rate, 0 sends as fast as possible
+        self.packet_size = packet_size  # UDP datagram size in bytes
         self.results = {}
     
+    def _open_jsonl(self):
+        if self.jsonl is None:
+            return None
+        if self.jsonl == '-':
+            return sys.stdout
+        return open(self.jsonl, 'a')
+    
+    def _close_jsonl(self, output):
+        if output is not None and output is not sys.stdout:
+            output.close()
+    
     def start_server(self):
         """Start a speed test server"""
         server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Accepted sockets inherit the buffer sizes, so the TCP window
+        # scale is negotiated with them in place
+        tune_socket(server, self.sndbuf, self.rcvbuf)
         server.bind(('0.0.0.0', self.port))
-        server.listen(1)
+        server.listen(MAX_STREAMS)
         
         print(f"Speed test server listening on port {self.port}")
         print("Waiting for client to connect...")
         
-        client_socket, client_address = server.accept()
-        print(f"Client connected from {client_address}")
-        
-        # Receive test
-        start_time = time.time()
-        total_received = 0
-        
-        # Receive 10MB of data
-        target_size = 10 * 1024 * 1024  # 10MB
-        data = b'0' * 1024  # 1KB chunk
-        
-        while total_received < target_size:
-            received = client_socket.recv(1024)
-            if not received:
-                break
-            total_received += len(received)
-        
-        end_time = time.time()
-        
-        # Calculate speed
-        duration = end_time - start_time
-        speed_mbps = (total_received * 8) / (duration * 1_000_000)
+        session = None
+        try:
+            # Wait for a control connection to negotiate the test
+            while session is None:
+                client_socket, client_address = server.accept()
+                try:
+                    kind, session_id, _ = self._read_conn_header(client_socket)
+                    if kind != CONN_CONTROL:
+                        raise ConnectionError("Expected a control connection")
+                    session = self._negotiate(client_socket, session_id)
+                except (ConnectionError, ValueError, struct.error) as e:
+                    print(f"Rejected {client_address[0]}: {e}")
+                    client_socket.close()
+            
+            if session['protocol'] == 'udp':
+                print(f"Client connected from {client_address} (UDP)")
+                done = recv_frame(client_socket)
+                result = {'type': 'result', 'mode': 'udp',
+                          'udp': session['receiver'].stop(done.get('packets', 0))}
+                send_frame(client_socket, result)
+                print(f"\nUDP Test Results (from {client_address[0]}):")
+                self._print_udp(result['udp'])
+                self.results = result
+                return result['udp']['mbps']
+            
+            print(f"Client connected from {client_address} "
+                  f"({session['mode']}, {session['streams']} stream(s))")
+            
+            # Attach the data streams of this session; each one starts
+            # moving data as soon as it is accepted
+            client_sends, client_receives = mode_directions(session['mode'])
+            with ThreadPoolExecutor(max_workers=2 * session['streams']) as pool:
+                jobs = []
+                while len(session['sockets']) < session['streams']:
+                    data_socket, _ = server.accept()
+                    try:
+                        kind, session_id, index = self._read_conn_header(data_socket)
+                    except (ConnectionError, ValueError, struct.error):
+                        data_socket.close()
+                        continue
+                    if (kind != CONN_DATA or session_id != session['id']
+                            or index >= session['streams'] or index in session['sockets']):
+                        data_socket.close()
+                        continue
+                    session['sockets'][index] = data_socket
+                    if client_sends:
+                        jobs.append(pool.submit(self._receive_stream, data_socket,
+                                                session['received'][index]))
+                    if client_receives:
+                        jobs.append(pool.submit(self._send_stream, data_socket,
+                                                session['sent'][index], *session['payload'],
+                                                target_size=session['target_size'],
+                                                duration=session['duration']))
+                for job in jobs:
+                    job.result()
+            
+            result = self._session_result(session)
+            send_frame(client_socket, result)
+        finally:
+            self._close_session(session)
+            server.close()
         
-        print(f"\nLocal Network Speed Test Results:")
-        print(f"  Data transferred: {total_received / 1_000_000:.2f} MB")
-        print(f"  Time: {duration:.2f} seconds")
-        print(f"  Speed: {speed_mbps:.2f} Mbps")
-        print(f"  From: {client_address[0]}")
+        print(f"\nLocal Network Speed Test Results (from {client_address[0]}):")
+        self._print_direction("Received", result.get('received'))
+        self._print_direction("Sent", result.get('sent'))
         
-        client_socket.close()
-        server.close()
+        output = self._open_jsonl()
+        if output is not None:
+            for direction, samples in session['sampler'].samples.items():
+                for sample in samples:
+                    write_jsonl(output, dict(type='sample', source='server',
+                                             direction=direction, **sample))
+            self._write_summaries(output, 'server', result)
+            self._close_jsonl(output)
         
-        return speed_mbps
+        self.results = result
+        return sum(result[d]['total']['mbps'] for d in ('received', 'sent') if d in result)
     
     def start_client(self, server_ip):
         """Connect to speed test server"""
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        session_id = os.urandom(16)
+        control = None
+        sockets = []
+        speed_mbps = 0
+        payload = None
+        output = None
         
         try:
-            client.connect((server_ip, self.port))
-            print(f"Connected to server at {server_ip}:{self.port}")
+            output = self._open_jsonl()
+            control = socket.create_connection((server_ip, self.port))
+            control.sendall(CONN_HEADER.pack(PROTOCOL_MAGIC, CONN_CONTROL, session_id, 0))
+            send_frame(control, {
+                'type': 'hello',
+                'mode': self.mode,
+                'streams': self.streams,
+                'target_size': self.target_size,
+                'duration': self.duration,
+                'interval': self.interval,
+                'warmup': self.warmup,
+                'samples': output is not None,
+                'protocol': self.protocol,
+                'rate_mbps': self.rate_mbps,
+                'packet_size': self.packet_size,
+            })
+            reply = recv_frame(control)
+            if reply.get('type') != 'ready':
+                raise ConnectionError(reply.get('message', 'Server refused the test'))
             
-            # Send test data
-            data = b'X' * 1024  # 1KB chunk
-            total_sent = 0
-            target_size = 10 * 1024 * 1024  # 10MB
+            if self.protocol == 'udp':
+                speed_mbps = self._run_udp_client(control, server_ip, reply['udp_port'])
+                return speed_mbps
             
-            start_time = time.time()
+            for index in range(self.streams):
+                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                tune_socket(client, self.sndbuf, self.rcvbuf)
+                client.connect((server_ip, self.port))
+                sockets.append(client)
+                client.sendall(CONN_HEADER.pack(PROTOCOL_MAGIC, CONN_DATA, session_id, index))
+            print(f"Connected to server at {server_ip}:{self.port} "
+                  f"({self.mode}, {self.streams} stream(s))")
             
-            while total_sent < target_size:
-                sent = client.send(data)
-                if sent == 0:
-                    break
-                total_sent += sent
+            # Drive all streams at once; each records its own timing
+            client_sends, client_receives = mode_directions(self.mode)
+            if client_sends:
+                payload = open_payload(self.chunk_size)
+            sent = [{'stream': index} for index in range(self.streams)]
+            received = [{'stream': index} for index in range(self.streams)]
+            directions = {}
+            if client_sends:
+                directions['sent'] = sent
+            if client_receives:
+                directions['received'] = received
+            sampler = IntervalSampler(directions, self.interval, self.warmup,
+                                      output, source='client')
+            cpu_start = time.process_time()
+            sampler.start()
+            with ThreadPoolExecutor(max_workers=2 * self.streams) as pool:
+                jobs = []
+                for index, client in enumerate(sockets):
+                    if client_receives:
+                        jobs.append(pool.submit(self._receive_stream, client, received[index]))
+                    if client_sends:
+                        jobs.append(pool.submit(self._send_stream, client, sent[index], *payload,
+                                                duration=self.duration))
+                for job in jobs:
+                    job.result()
+            intervals = sampler.stop()
+            cpu_seconds = time.process_time() - cpu_start
+            
+            # Upload figures come from what the server actually received
+            server_result = recv_frame(control)
+            if server_result.get('type') != 'result':
+                raise ConnectionError(server_result.get('message', 'No result from server'))
             
-            end_time = time.time()
+            self.results = {}
+            if client_sends:
+                self.results['upload'] = server_result['received']
+            if client_receives:
+                self.results['download'] = {
+                    'streams': received,
+                    'total': self._summarize(received, cpu_seconds),
+                    'intervals': intervals['received']
+                }
             
-            duration = end_time - start_time
-            speed_mbps = (total_sent * 8) / (duration * 1_000_000)
+            if output is not None:
+                # The server's receive samples are the accurate upload time series
+                for t, size, mbps, warmup in server_result.get('samples', {}).get('received', []):
+                    write_jsonl(output, {'type': 'sample', 'source': 'server',
+                                         'direction': 'received', 't': t, 'bytes': size,
+                                         'mbps': mbps, 'warmup': warmup})
+                self._write_summaries(output, 'client', self.results)
             
-            print(f"\nSpeed test complete:")
-            print(f"  Data sent: {total_sent / 1_000_000:.2f} MB")
-            print(f"  Time: {duration:.2f} seconds")
-            print(f"  Speed: {speed_mbps:.2f} Mbps")
-            print(f"  To: {server_ip}")
+            print(f"\nSpeed test complete ({server_ip}):")
+            self._print_direction("Upload (server-confirmed)", self.results.get('upload'))
+            self._print_direction("Download", self.results.get('download'))
+            speed_mbps = sum(r['total']['mbps'] for r in self.results.values())
             
         except Exception as e:
             print(f"Error: {e}")
         finally:
-            client.close()
+            for client in sockets:
+                client.close()
+            if control is not None:
+                control.close()
+            if payload is not None:
+                payload[1].close()
+                payload[0].close()
+            self._close_jsonl(output)
         
         return speed_mbps
+    
+    def _run_udp_client(self, control, server_ip, udp_port):
+        """Send paced UDP datagrams and report what the server received"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            tune_socket(sock, self.sndbuf)
+            sock.connect((server_ip, udp_port))
+            print(f"Sending UDP to {server_ip}:{udp_port} at "
+                  f"{self.rate_mbps or 'unlimited'} Mbps, {self.packet_size} byte packets")
+            sent = self._send_udp(sock)
+        finally:
+            sock.close()
+        
+        send_frame(control, {'type': 'udp_done', 'packets': sent['packets']})
+        server_result = recv_frame(control)
+        if server_result.get('type') != 'result':
+            raise ConnectionError(server_result.get('message', 'No result from server'))
+        
+        self.results = {'udp': {'sent': sent, 'received': server_result['udp']}}
+        print(f"\nUDP test complete ({server_ip}):")
+        print(f"  Sent: {sent['packets']} packets, {sent['bytes'] / 1_000_000:.2f} MB "
+              f"in {sent['duration']:.2f} s = {sent['mbps']:.2f} Mbps")
+        self._print_udp(server_result['udp'])
+        return server_result['udp']['mbps']
+    
+    def _send_udp(self, sock):
+        """Send sequence-numbered datagrams at the target rate"""
+        packet = bytearray(b'X' * self.packet_size)
+        pack_into = UDP_HEADER.pack_into
+        clock = time.perf_counter_ns
+        send = sock.send
+        gap_ns = (self.packet_size * 8 * 1e9 / (self.rate_mbps * 1e6)) if self.rate_mbps else 0
+        
+        start = clock()
+        if self.duration:
+            deadline = start + int(self.duration * 1e9)
+            packet_limit = None
+        else:
+            deadline = None
+            packet_limit = math.ceil(self.target_size / self.packet_size)
+        next_send = start
+        sequence = 0
+        
+        while True:
+            now = clock()
+            if deadline is not None:
+                if now >= deadline:
+                    break
+            elif sequence >= packet_limit:
+                break
+            
+            if gap_ns:
+                wait = next_send - now
+                if wait > 0:
+                    # Sleep through long gaps, spin through short ones so
+                    # the pacing stays accurate at high packet rates
+                    if wait > 1_000_000:
+                        time.sleep((wait - 500_000) / 1e9)
+                    continue
+                if -wait > MAX_PACING_DEBT_NS:
+                    next_send = now
+                next_send += gap_ns
+            
+            pack_into(packet, 0, sequence, now)
+            try:
+                send(packet)
+            except (BlockingIOError, InterruptedError):
+                continue
+            sequence += 1
+        
+        duration = (clock() - start) / 1e9
+        total_bytes = sequence * self.packet_size
+        return {
+            'packets': sequence,
+            'bytes': total_bytes,
+            'duration': duration,
+            'mbps': total_bytes * 8 / (duration * 1_000_000) if duration > 0 else 0.0,
+        }
+    
+    @staticmethod
+    def _print_udp(stats):
+        print(f"  Received: {stats['packets_received']} packets, {stats['bytes'] / 1_000_000:.2f} MB "
+              f"in {stats['duration']:.2f} s = {stats['mbps']:.2f} Mbps ({stats['pps']:.0f} pps)")
+        print(f"  Lost: {stats['lost']} ({stats['loss_pct']:.2f}%)  "
+              f"Reordered: {stats['reordered']}  Duplicates: {stats['duplicates']}"
+              + (f"  Too late: {stats['late']}" if stats.get('late') else ""))
+        print(f"  Jitter: {stats['jitter_ms']:.3f} ms")
+    
+    @staticmethod
+    def _read_conn_header(sock):
+        magic, kind, session_id, index = CONN_HEADER.unpack(recv_exact(sock, CONN_HEADER.size))
+        if magic != PROTOCOL_MAGIC:
+            raise ConnectionError("Not a speed test client")
+        return kind, session_id, index
+    
+    def _negotiate(self, control, session_id):
+        """Validate a client's hello and set up its session"""
+        hello = recv_frame(control)
+        error = check_hello(hello)
+        if error:
+            send_frame(control, {'type': 'error', 'message': error})
+            raise ValueError(error)
+        
+        if hello.get('protocol') == 'udp':
+            receiver = open_udp_receiver('0.0.0.0', self.port, udp_packet_limit(hello), self.rcvbuf)
+            send_frame(control, {'type': 'ready', 'udp_port': self.port})
+            return {'protocol': 'udp', 'control': control, 'receiver': receiver}
+        
+        mode, streams, target_size = hello['mode'], hello['streams'], hello['target_size']
+        client_sends, client_receives = mode_directions(mode)
+        session = {
+            'id': session_id,
+            'protocol': 'tcp',
+            'control': control,
+            'mode': mode,
+            'streams': streams,
+            'target_size': target_size,
+            'sockets': {},
+            'received': [{'stream': i} for i in range(streams)] if client_sends else None,
+            'sent': [{'stream': i} for i in range(streams)] if client_receives else None,
+            'payload': open_payload(self.chunk_size) if client_receives else None,
+            'duration': hello.get('duration'),
+            'want_samples': bool(hello.get('samples')),
+            'cpu_start': time.process_time(),
+        }
+        directions = {name: session[name] for name in ('received', 'sent') if session[name]}
+        session['sampler'] = IntervalSampler(directions, hello.get('interval', 0.1),
+                                             hello.get('warmup', 0.0), source='server')
+        send_frame(control, {'type': 'ready'})
+        session['sampler'].start()
+        return session
+    
+    def _session_result(self, session):
+        """Build the result message the server reports back to the client"""
+        intervals = session['sampler'].stop()
+        cpu_seconds = time.process_time() - session['cpu_start']
+        return build_result(session, intervals, cpu_seconds)
+    
+    @staticmethod
+    def _close_session(session):
+        if session is None:
+            return
+        if session['protocol'] == 'udp':
+            session['receiver'].close()
+            session['control'].close()
+            return
+        session['sampler'].stop()
+        for data_socket in session['sockets'].values():
+            data_socket.close()
+        session['control'].close()
+        if session['payload'] is not None:
+            session['payload'][1].close()
+            session['payload'][0].close()
+    
+    def _receive_stream(self, client_socket, result):
+        """Receive one stream until the sender shuts down its side"""
+        # One buffer per stream, reused for every recv_into call
+        buffer = memoryview(bytearray(self.chunk_size))
+        start_time = time.perf_counter_ns()
+        total_received = 0
+        
+        while True:
+            received = client_socket.recv_into(buffer)
+            if not received:
+                break
+            total_received += received
+            result['bytes'] = total_received
+        
+        end_time = time.perf_counter_ns()
+        result.update(self._stream_stats(total_received, start_time, end_time))
+    
+    def _send_stream(self, client, result, payload_file, payload, target_size=None, duration=None):
+        """Send one stream of test data from the shared payload"""
+        data = memoryview(payload)
+        chunk_size = len(payload)
+        target_size = target_size or self.target_size
+        total_sent = 0
+        
+        start_time = time.perf_counter_ns()
+        if duration:
+            # Time-bound test: the byte target no longer applies
+            deadline = start_time + int(duration * 1e9)
+            target_size = float('inf')
+        else:
+            deadline = None
+        
+        try:
+            while total_sent < target_size:
+                if deadline is not None and time.perf_counter_ns() >= deadline:
+                    break
+                size = min(chunk_size, target_size - total_sent)
+                if self.use_sendfile:
+                    # Explicit offset keeps concurrent streams off the shared file position
+                    sent = os.sendfile(client.fileno(), payload_file.fileno(), 0, size)
+                    if sent == 0:
+                        break
+                else:
+                    with data[:size] as chunk:
+                        client.sendall(chunk)
+                    sent = size
+                total_sent += sent
+                result['bytes'] = total_sent
+        finally:
+            # A failed send's traceback keeps this frame alive; an unreleased
+            # view would then stop the caller from closing the mmap
+            data.release()
+        
+        end_time = time.perf_counter_ns()
+        # Half-close so the receiver sees EOF while our own reads continue
+        client.shutdown(socket.SHUT_WR)
+        result.update(self._stream_stats(total_sent, start_time, end_time))
+    
+    @staticmethod
+    def _stream_stats(total_bytes, start_time, end_time):
+        """Throughput of one stream; times are perf_counter_ns values"""
+        duration = (end_time - start_time) / 1e9
+        return {
+            'bytes': total_bytes,
+            'start': start_time,
+            'end': end_time,
+            'duration': duration,
+            'mbps': (total_bytes * 8) / (duration * 1_000_000) if duration > 0 else 0.0
+        }
+    
+    @staticmethod
+    def _summarize(stream_results, cpu_seconds=None):
+        """Combine per-stream results into session totals"""
+        total_bytes = sum(r['bytes'] for r in stream_results)
+        start_time = min(r['start'] for r in stream_results)
+        end_time = max(r['end'] for r in stream_results)
+        total = LocalNetworkSpeedTest._stream_stats(total_bytes, start_time, end_time)
+        if cpu_seconds is not None:
+            total['cpu_seconds'] = cpu_seconds
+            total['cpu_per_gb'] = cpu_seconds / (total_bytes / 1e9) if total_bytes else 0.0
+        return total
+    
+    @staticmethod
+    def _print_direction(title, direction):
+        if not direction:
+            return
+        stream_results, total = direction['streams'], direction['total']
+        print(f"  {title}:")
+        if len(stream_results) > 1:
+            for r in stream_results:
+                print(f"    Stream {r['stream'] + 1}: {r['bytes'] / 1_000_000:.2f} MB "
+                      f"in {r['duration']:.2f} s = {r['mbps']:.2f} Mbps")
+        print(f"    Data transferred: {total['bytes'] / 1_000_000:.2f} MB")
+        print(f"    Time: {total['duration']:.2f} seconds")
+        print(f"    Speed: {total['mbps']:.2f} Mbps")
+        if 'cpu_per_gb' in total:
+            print(f"    CPU: {total['cpu_seconds']:.2f} s ({total['cpu_per_gb']:.2f} s per GB)")
+        intervals = direction.get('intervals')
+        if intervals:
+            print(f"    Intervals: min {intervals['min']:.2f} / median {intervals['median']:.2f} / "
+                  f"p95 {intervals['p95']:.2f} / max {intervals['max']:.2f} Mbps "
+                  f"({intervals['samples']} samples)")
+    
+    @staticmethod
+    def _write_summaries(output, source, results):
+        for direction, result in results.items():
+            if isinstance(result, dict) and 'total' in result:
+                write_jsonl(output, {'type': 'summary', 'source': source, 'direction': direction,
+                                     'total': result['total'], 'intervals': result.get('intervals')})
+
+class AsyncSpeedTestServer:
+    """Persistent speed test endpoint that serves many clients at once"""
+    
+    def __init__(self, port=5555, host='0.0.0.0', max_sessions=32, max_streams=16,
+                 max_target_size=1024 ** 3, max_duration=60, session_timeout=120, header_timeout=10,
+                 chunk_size=128 * 1024, sndbuf=None, rcvbuf=None, use_sendfile=False, jsonl=None):
+        self.port = port
+        self.host = host
+        self.max_sessions = max_sessions        # Concurrent test sessions
+        self.max_streams = max_streams          # Data streams per session
+        self.max_target_size = max_target_size  # Bytes per stream and direction in size-based tests
+        self.max_duration = max_duration        # Seconds for duration-based tests
+        self.session_timeout = session_timeout  # Seconds a whole session may take
+        self.header_timeout = header_timeout    # Seconds to send headers and hello
+        self.chunk_size = chunk_size            # Bytes per send/recv call
+        self.sndbuf = sndbuf                    # SO_SNDBUF, None keeps the OS default
+        self.rcvbuf = rcvbuf                    # SO_RCVBUF, None keeps the OS default
+        self.use_sendfile = use_sendfile and hasattr(os, 'sendfile')
+        self.jsonl = jsonl                      # Path for per-session JSONL samples, '-' for stdout
+        self.sessions = {}
+        self.completed = 0
+    
+    def run(self):
+        """Serve until interrupted"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\nSpeed test server stopped")
+    
+    async def serve(self):
+        """Accept connections forever, one task per connection"""
+        loop = asyncio.get_running_loop()
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        tune_socket(server, self.sndbuf, self.rcvbuf)
+        server.bind((self.host, self.port))
+        server.listen(1024)
+        server.setblocking(False)
+        
+        # One read-only payload shared by every session that sends
+        self.payload_file, payload = open_payload(self.chunk_size)
+        self.payload = memoryview(payload)
+        
+        print(f"Persistent speed test server listening on {self.host}:{self.port}")
+        print(f"  Limits: {self.max_sessions} sessions, {self.max_streams} streams each, "
+              f"{self.session_timeout} s per session")
+        
+        connections = set()
+        try:
+            while True:
+                conn, address = await loop.sock_accept(server)
+                task = asyncio.create_task(self._handle_connection(conn, address))
+                connections.add(task)
+                task.add_done_callback(connections.discard)
+        finally:
+            # Stream tasks hold views of the payload until they finish, and a
+            # cancelled one's traceback keeps its frames (and views) alive in
+            # a reference cycle: wait for them all, drop them, then collect
+            # the cycles so closing the mmap can't hit BufferError
+            pending = list(connections) + [stream for session in self.sessions.values()
+                                           for stream in session.get('tasks', ())]
+            for stream in pending:
+                stream.cancel()
+            if pending:
+                await asyncio.wait(pending)
+            pending = stream = task = None
+            gc.collect()
+            server.close()
+            self.payload.release()
+            payload.close()
+            self.payload_file.close()
+    
+    async def _recv_exact(self, conn, size):
+        loop = asyncio.get_running_loop()
+        data = bytearray()
+        while len(data) < size:
+            chunk = await loop.sock_recv(conn, size - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed mid-message")
+            data += chunk
+        return bytes(data)
+    
+    async def _recv_frame(self, conn):
+        (size,) = FRAME_HEADER.unpack(await self._recv_exact(conn, FRAME_HEADER.size))
+        if size > MAX_FRAME_SIZE:
+            raise ConnectionError(f"Control frame too large ({size} bytes)")
+        return json.loads((await self._recv_exact(conn, size)).decode('utf-8'))
+    
+    async def _send_frame(self, conn, message):
+        body = json.dumps(message).encode('utf-8')
+        await asyncio.get_running_loop().sock_sendall(conn, FRAME_HEADER.pack(len(body)) + body)
+    
+    async def _handle_connection(self, conn, address):
+        """Route a new connection to the control or data handler"""
+        try:
+            header = await asyncio.wait_for(self._recv_exact(conn, CONN_HEADER.size),
+                                            self.header_timeout)
+            magic, kind, session_id, index = CONN_HEADER.unpack(header)
+            if magic != PROTOCOL_MAGIC:
+                raise ConnectionError("Not a speed test client")
+            if kind == CONN_CONTROL:
+                await self._handle_control(conn, address, session_id)
+            elif kind == CONN_DATA:
+                await self._handle_data(conn, session_id, index)
+        except (ConnectionError, OSError, ValueError, struct.error, asyncio.TimeoutError) as e:
+            print(f"[-] {address[0]}: {e or type(e).__name__}")
+        finally:
+            conn.close()
+    
+    async def _handle_control(self, conn, address, session_id):
+        """Negotiate one session, wait for its streams and report the result"""
+        hello = await asyncio.wait_for(self._recv_frame(conn), self.header_timeout)
+        error = check_hello(hello, self.max_streams, self.max_target_size, self.max_duration)
+        if error is None and len(self.sessions) >= self.max_sessions:
+            error = "Server busy, try again later"
+        if error is None and session_id in self.sessions:
+            error = "Session id already in use"
+        if error:
+            await self._send_frame(conn, {'type': 'error', 'message': error})
+            raise ValueError(error)
+        
+        if hello.get('protocol') == 'udp':
+            await self._handle_udp(conn, address, session_id, hello)
+            return
+        
+        client_sends, client_receives = mode_directions(hello['mode'])
+        streams = hello['streams']
+        session = {
+            'mode': hello['mode'],
+            'streams': streams,
+            'target_size': hello['target_size'],
+            'duration': hello.get('duration'),
+            'want_samples': bool(hello.get('samples')),
+            'attached': set(),
+            'tasks': [],
+            'finished': 0,
+            'done': asyncio.Event(),
+            'error': None,
+            'received': [{'stream': i} for i in range(streams)] if client_sends else None,
+            'sent': [{'stream': i} for i in range(streams)] if client_receives else None,
+        }
+        directions = {name: session[name] for name in ('received', 'sent') if session[name]}
+        session['sampler'] = IntervalSampler(directions, hello.get('interval', 0.1),
+                                             hello.get('warmup', 0.0), source='server')
+        self.sessions[session_id] = session
+        try:
+            await self._send_frame(conn, {'type': 'ready'})
+            session['sampler'].start()
+            await asyncio.wait_for(session['done'].wait(), self.session_timeout)
+            if session['error']:
+                await self._send_frame(conn, {'type': 'error', 'message': session['error']})
+                raise ConnectionError(session['error'])
+            
+            result = build_result(session, session['sampler'].stop())
+            await self._send_frame(conn, result)
+        except asyncio.TimeoutError:
+            await self._send_frame(conn, {'type': 'error', 'message': "Session time limit reached"})
+            raise
+        finally:
+            # Tear down only this session's streams
+            session['sampler'].stop()
+            for task in session['tasks']:
+                task.cancel()
+            del self.sessions[session_id]
+        
+        if self.jsonl is not None:
+            output = sys.stdout if self.jsonl == '-' else open(self.jsonl, 'a')
+            try:
+                for direction, samples in session['sampler'].samples.items():
+                    for sample in samples:
+                        write_jsonl(output, dict(type='sample', source='server', client=address[0],
+                                                 direction=direction, **sample))
+                LocalNetworkSpeedTest._write_summaries(output, 'server', result)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+        
+        self.completed += 1
+        summary = ', '.join(f"{d} {result[d]['total']['mbps']:.2f} Mbps"
+                            for d in ('received', 'sent') if d in result)
+        print(f"[+] Session {self.completed} from {address[0]}: "
+              f"{session['mode']}, {session['streams']} stream(s), {summary}")
+    
+    async def _handle_udp(self, conn, address, session_id, hello):
+        """Run a UDP session on its own ephemeral port"""
+        # Reading datagrams one await at a time would cap the packet rate,
+        # so the receive loop runs on a thread of its own
+        receiver = open_udp_receiver(self.host, 0, udp_packet_limit(hello), self.rcvbuf)
+        self.sessions[session_id] = {'protocol': 'udp', 'receiver': receiver}
+        try:
+            await self._send_frame(conn, {'type': 'ready',
+                                          'udp_port': receiver.sock.getsockname()[1]})
+            done = await asyncio.wait_for(self._recv_frame(conn), self.session_timeout)
+            stats = await asyncio.to_thread(receiver.stop, done.get('packets', 0))
+            await self._send_frame(conn, {'type': 'result', 'mode': 'udp', 'udp': stats})
+        except asyncio.TimeoutError:
+            await self._send_frame(conn, {'type': 'error', 'message': "Session time limit reached"})
+            raise
+        finally:
+            receiver.close()
+            del self.sessions[session_id]
+        
+        self.completed += 1
+        print(f"[+] Session {self.completed} from {address[0]}: UDP, "
+              f"{stats['mbps']:.2f} Mbps, {stats['loss_pct']:.2f}% loss, "
+              f"{stats['jitter_ms']:.3f} ms jitter")
+    
+    async def _handle_data(self, conn, session_id, index):
+        """Run one data stream of an already negotiated session"""
+        session = self.sessions.get(session_id)
+        if session is None or session.get('protocol') == 'udp' or index >= session['streams'] or index in session['attached']:
+            raise ConnectionError("Unknown or duplicate data stream")
+        session['attached'].add(index)
+        
+        # Size-based streams may not exceed what was negotiated; duration
+        # streams are bounded by max_duration and session_timeout instead
+        limit = None if session['duration'] else session['target_size']
+        directions = []
+        if session['received'] is not None:
+            directions.append(self._receive_stream(conn, session['received'][index], limit))
+        if session['sent'] is not None:
+            directions.append(self._send_stream(conn, session['sent'][index],
+                                                session['target_size'], session['duration']))
+        task = asyncio.ensure_future(asyncio.gather(*directions))
+        session['tasks'].append(task)
+        try:
+            await task
+        except (ConnectionError, OSError) as e:
+            session['error'] = f"Stream {index + 1} failed: {e}"
+            raise
+        finally:
+            session['finished'] += 1
+            if session['finished'] == session['streams']:
+                session['done'].set()
+    
+    async def _receive_stream(self, conn, result, limit=None):
+        loop = asyncio.get_running_loop()
+        buffer = memoryview(bytearray(self.chunk_size))
+        start_time = time.perf_counter_ns()
+        total_received = 0
+        
+        while True:
+            received = await loop.sock_recv_into(conn, buffer)
+            if not received:
+                break
+            total_received += received
+            result['bytes'] = total_received
+            if limit is not None and total_received > limit:
+                raise ConnectionError("Stream exceeded the per-stream byte limit")
+        
+        result.update(LocalNetworkSpeedTest._stream_stats(total_received, start_time,
+                                                          time.perf_counter_ns()))
+    
+    async def _send_stream(self, conn, result, target_size, duration=None):
+        loop = asyncio.get_running_loop()
+        chunk_size = len(self.payload)
+        start_time = time.perf_counter_ns()
+        if duration:
+            deadline = start_time + int(duration * 1e9)
+            target_size = float('inf')
+        else:
+            deadline = None
+        total_sent = 0
+        
+        while total_sent < target_size:
+            if deadline is not None and time.perf_counter_ns() >= deadline:
+                break
+            size = min(chunk_size, target_size - total_sent)
+            if self.use_sendfile:
+                await loop.sock_sendfile(conn, self.payload_file, 0, size, fallback=False)
+            else:
+                await loop.sock_sendall(conn, self.payload[:size])
+            total_sent += size
+            result['bytes'] = total_sent
+        
+        conn.shutdown(socket.SHUT_WR)
+        result.update(LocalNetworkSpeedTest._stream_stats(total_sent, start_time,
+                                                          time.perf_counter_ns()))
+
+
+class RealTimeBandwidthMonitor:
+    """Per-interface bandwidth from /proc/net/dev, falling back to psutil"""
+    
+    PROC_NET_DEV = '/proc/net/dev'
+    FIELDS_PER_LINE = 17  # Interface name plus 16 counters
+    RX_BYTES = 1
+    TX_BYTES = 9
+    
+    def __init__(self, interval=1.0, interfaces=None, top=10, proc_path=PROC_NET_DEV):
+        self.interval = interval
+        self.interfaces = set(interfaces) if interfaces else None
+        self.top = top
+        self.proc_path = proc_path
+        self._file = None
+        self._buffer = bytearray(64 * 1024)
+        self._name_tokens = None
+        self._names = ()
+        self._previous = None
+        
+        try:
+            # Kept open for the monitor's lifetime; every sample re-reads it
+            # from offset 0 into the same buffer
+            self._file = open(proc_path, 'rb', buffering=0)
+        except OSError:
+            self._file = None
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def read_counters(self):
+        """Return (interface names, rx byte counters, tx byte counters)"""
+        if self._file is None:
+            return self._read_psutil()
+        
+        # /proc files may hand back less than a full read, so keep reading
+        # until EOF and grow the buffer only if the file outgrows it
+        self._file.seek(0)
+        view = memoryview(self._buffer)
+        size = 0
+        while True:
+            count = self._file.readinto(view[size:])
+            if not count:
+                break
+            size += count
+            if size == len(self._buffer):
+                view.release()
+                self._buffer.extend(bytes(len(self._buffer)))
+                view = memoryview(self._buffer)
+        
+        # Skip the two header lines, then split the rest in one C-level call
+        # (bytes tokens split and compare about twice as fast as bytearray ones)
+        start = self._buffer.index(b'\n', self._buffer.index(b'\n') + 1) + 1
+        fields = bytes(view[start:size]).split()
+        view.release()
+        
+        step = self.FIELDS_PER_LINE
+        name_tokens = fields[0::step]
+        if name_tokens != self._name_tokens:
+            # Interfaces appeared or vanished; decode the names once
+            if not all(token.endswith(b':') for token in name_tokens):
+                return self._parse_lines(start, size)
+            self._name_tokens = name_tokens
+            self._names = tuple(token[:-1].decode() for token in name_tokens)
+        
+        return (self._names,
+                list(map(int, fields[self.RX_BYTES::step])),
+                list(map(int, fields[self.TX_BYTES::step])))
+    
+    def _parse_lines(self, start, size):
+        """Slow path for kernels that glue the counters to the 'name:' field"""
+        names, rx, tx = [], [], []
+        for line in bytes(self._buffer[start:size]).splitlines():
+            name, _, counters = line.partition(b':')
+            values = counters.split()
+            names.append(name.strip().decode())
+            rx.append(int(values[self.RX_BYTES - 1]))
+            tx.append(int(values[self.TX_BYTES - 1]))
+        self._name_tokens = None
+        return tuple(names), rx, tx
+    
+    def _read_psutil(self):
+        import psutil
+        counters = psutil.net_io_counters(pernic=True)
+        names = tuple(counters)
+        return (names,
+                [counters[name].bytes_recv for name in names],
+                [counters[name].bytes_sent for name in names])
+    
+    def sample(self):
+        """Return {interface: (rx bytes/s, tx bytes/s)} since the previous sample"""
+        now = time.perf_counter_ns()
+        names, rx, tx = self.read_counters()
+        previous, self._previous = self._previous, (now, names, rx, tx)
+        if previous is None:
+            return {}
+        
+        last_time, last_names, last_rx, last_tx = previous
+        elapsed = (now - last_time) / 1e9
+        if names is not last_names and names != last_names:
+            # Line up counters by name when the interface list changed
+            index = {name: i for i, name in enumerate(last_names)}
+            last_rx = [last_rx[index[name]] if name in index else value
+                       for name, value in zip(names, rx)]
+            last_tx = [last_tx[index[name]] if name in index else value
+                       for name, value in zip(names, tx)]
+        
+        rates = {}
+        for name, new_rx, old_rx, new_tx, old_tx in zip(names, rx, last_rx, tx, last_tx):
+            if self.interfaces is not None and name not in self.interfaces:
+                continue
+            # Counters go backwards when a device is reset; report zero then
+            rates[name] = (max(new_rx - old_rx, 0) / elapsed, max(new_tx - old_tx, 0) / elapsed)
+        return rates
+    
+    def monitor(self, duration=None):
+        """Print the busiest interfaces every interval until Ctrl+C"""
+        print(f"\nMonitoring bandwidth every {self.interval:g} s (Ctrl+C to stop)")
+        deadline = None if duration is None else time.perf_counter() + duration
+        next_tick = time.perf_counter()
+        self.sample()
+        
+        try:
+            while deadline is None or time.perf_counter() < deadline:
+                next_tick += self.interval
+                time.sleep(max(0.0, next_tick - time.perf_counter()))
+                rates = self.sample()
+                busiest = sorted(rates.items(), key=lambda item: item[1][0] + item[1][1],
+                                 reverse=True)[:self.top]
+                
+                print(f"\n{time.strftime('%H:%M:%S')}  {'Interface':<16}{'Down (Mbps)':>14}{'Up (Mbps)':>14}")
+                for name, (rx_rate, tx_rate) in busiest:
+                    print(f"          {name:<16}{rx_rate * 8 / 1e6:>14.2f}{tx_rate * 8 / 1e6:>14.2f}")
+                if len(rates) > len(busiest):
+                    print(f"          ... {len(rates) - len(busiest)} more interface(s)")
+        except KeyboardInterrupt:
+            print("\nMonitoring stopped")
+        finally:
+            self.close()
+
 
 def main_menu():
     print("=" * 60)
@@ -106,6 +1320,41 @@ def main_menu():
     return choice
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Network speed tools (interactive menu unless --serve)")
+    parser.add_argument('--serve', nargs='?', const=5555, type=int, metavar='PORT',
+                        help="run the persistent multi-client server (default port 5555)")
+    parser.add_argument('--port', type=int, default=5555, help="port for the menu's local speed test")
+    tuning = parser.add_argument_group('speed test tuning (menu tests and --serve)')
+    tuning.add_argument('--chunk-size', type=int, default=128 * 1024, help="bytes per send/recv call")
+    tuning.add_argument('--sndbuf', type=int, help="SO_SNDBUF in bytes (default: OS)")
+    tuning.add_argument('--rcvbuf', type=int, help="SO_RCVBUF in bytes (default: OS)")
+    tuning.add_argument('--sendfile', action='store_true', help="send with sendfile() where available")
+    tuning.add_argument('--jsonl', help="append per-interval samples and summaries ('-' for stdout)")
+    tuning.add_argument('--interval', type=float, default=0.1, help="seconds between throughput samples")
+    tuning.add_argument('--warmup', type=float, default=0.0, help="seconds of samples left out of summaries")
+    limits = parser.add_argument_group('persistent server limits')
+    limits.add_argument('--max-sessions', type=int, default=32, help="concurrent test sessions")
+    limits.add_argument('--max-streams', type=int, default=16, help="data streams per session")
+    limits.add_argument('--max-target-size', type=int, default=1024 ** 3,
+                        help="bytes per stream in size-based tests")
+    limits.add_argument('--max-duration', type=float, default=60, help="seconds for duration-based tests")
+    limits.add_argument('--session-timeout', type=float, default=120, help="seconds a whole session may take")
+    limits.add_argument('--header-timeout', type=float, default=10, help="seconds to send headers and hello")
+    args = parser.parse_args()
+    
+    if args.interval < MIN_INTERVAL:
+        parser.error(f"--interval must be at least {MIN_INTERVAL}")
+    tuning_options = dict(chunk_size=args.chunk_size, sndbuf=args.sndbuf, rcvbuf=args.rcvbuf,
+                          use_sendfile=args.sendfile, jsonl=args.jsonl)
+    server_options = dict(tuning_options, max_sessions=args.max_sessions, max_streams=args.max_streams,
+                          max_target_size=args.max_target_size, max_duration=args.max_duration,
+                          session_timeout=args.session_timeout, header_timeout=args.header_timeout)
+    
+    if args.serve is not None:
+        # Unattended endpoint: python speed.py --serve [port]
+        AsyncSpeedTestServer(port=args.serve, **server_options).run()
+        sys.exit(0)
+    
     print("Network Speed Tools")
     print("=" * 50)
     
@@ -143,30 +1392,43 @@ if __name__ == "__main__":
             print("\nLocal device speed test")
             print("1. Start as SERVER (wait for connection)")
             print("2. Start as CLIENT (connect to server)")
+            print("3. Start as PERSISTENT SERVER (many clients, Ctrl+C to stop)")
             sub_choice = input("\nSelect: ")
             
-            tester = LocalNetworkSpeedTest()
+            tester = LocalNetworkSpeedTest(port=args.port, interval=args.interval,
+                                           warmup=args.warmup, **tuning_options)
             
             if sub_choice == '1':
                 tester.start_server()
+            elif sub_choice == '3':
+                AsyncSpeedTestServer(port=tester.port, **server_options).run()
             elif sub_choice == '2':
                 server_ip = input("Enter server IP address: ")
+                streams = input("Parallel streams (default: 1): ").strip()
+                mode = input("Mode - upload, reverse, bidir or udp (default: upload): ").strip()
+                duration = input("Duration in seconds (default: 10 MB per stream): ").strip()
+                tester.streams = int(streams) if streams.isdigit() else 1
+                tester.mode = mode if mode in MODES else 'upload'
+                if mode == 'udp':
+                    rate = input("UDP rate in Mbps (default: 100): ").strip()
+                    tester.protocol = 'udp'
+                    tester.rate_mbps = float(rate) if rate else 100
+                tester.duration = float(duration) if duration else None
                 tester.start_client(server_ip)
         elif choice == '4':
+            from latency import LatencyProber, iter_hosts, print_results
+            
             # Get local IP range
-            import socket
             hostname = socket.gethostname()
             local_ip = socket.gethostbyname(hostname)
             network_prefix = '.'.join(local_ip.split('.')[:3])
             
             print(f"\nTesting latency in network {network_prefix}.0/24")
+            targets = input("Targets (default: whole /24; hosts or CIDR, space separated): ").split()
+            targets = list(iter_hosts(targets or [f"{network_prefix}.0/24"]))
             
-            # Test common IPs
-            common_ips = [f"{network_prefix}.{i}" for i in [1, 254, 100, 101, 102]]
-            
-            for ip in common_ips:
-                print(f"\nTesting {ip}...")
-                os.system(f"ping -n 2 {ip}" if os.name == 'nt' else f"ping -c 2 {ip}")
+            print(f"Probing {len(targets)} host(s)...")
+            print_results(LatencyProber().run(targets))
         elif choice == '5':
             print("Goodbye!")
             break
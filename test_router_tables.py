@@ -0,0 +1,56 @@
+import unittest
+
+from router_tables import detect_columns, iter_device_rows, parse_device_table
+
+
+def table(header, *rows):
+    cells = ''.join(f"<th>{text}</th>" for text in header)
+    body = ''.join('<tr>' + ''.join(f"<td>{text}</td>" for text in row) + '</tr>' for row in rows)
+    return f"<html><body><table><tr>{cells}</tr>{body}</table></body></html>"
+
+
+class DetectColumnsTest(unittest.TestCase):
+    def test_common_headers(self):
+        self.assertEqual(detect_columns(['IP Address', 'MAC Address', 'Host Name']),
+                         {'ip': 0, 'mac': 1, 'hostname': 2})
+        self.assertEqual(detect_columns(['Device Name', 'IP', 'MAC']),
+                         {'hostname': 0, 'ip': 1, 'mac': 2})
+
+    def test_hostname_header(self):
+        self.assertEqual(detect_columns(['IP', 'MAC', 'Hostname']),
+                         {'ip': 0, 'mac': 1, 'hostname': 2})
+
+    def test_ip_version_headers(self):
+        self.assertEqual(detect_columns(['IPv4', 'Hostname']), {'ip': 0, 'hostname': 1})
+        self.assertEqual(detect_columns(['Hostname', 'IPv6']), {'hostname': 0, 'ip': 1})
+
+    def test_no_device_columns(self):
+        self.assertIsNone(detect_columns(['Port', 'Status', 'Lease']))
+
+
+class IterDeviceRowsTest(unittest.TestCase):
+    def test_hostname_column(self):
+        page = table(['IP', 'MAC', 'Hostname'], ['192.168.1.10', 'aa:bb:cc:dd:ee:ff', 'nas'])
+        self.assertEqual(list(iter_device_rows(page)), [{
+            'ip': '192.168.1.10', 'mac': 'aa:bb:cc:dd:ee:ff', 'hostname': 'nas', 'status': 'Connected'}])
+
+    def test_ipv4_table_without_mac(self):
+        page = table(['Hostname', 'IPv4'], ['printer', '192.168.1.20'], ['tv', '192.168.1.21'])
+        devices = list(iter_device_rows(page))
+        self.assertEqual([(d['hostname'], d['ip'], d['mac']) for d in devices],
+                         [('printer', '192.168.1.20', 'Unknown'), ('tv', '192.168.1.21', 'Unknown')])
+
+
+class ParseDeviceTableTest(unittest.TestCase):
+    def test_empty_device_table(self):
+        self.assertEqual(parse_device_table(table(['IP Address', 'MAC Address', 'Host Name'])), [])
+
+    def test_login_page(self):
+        page = ("<html><body><form><table><tr><td>Username</td><td><input name='user'></td></tr>"
+                "<tr><td>Password</td><td><input name='pass' type='password'></td></tr>"
+                "</table></form></body></html>")
+        self.assertIsNone(parse_device_table(page))
+
+
+if __name__ == "__main__":
+    unittest.main()